@@ -0,0 +1,74 @@
+import numpy as np
+import distance
+import spatial_index
+
+
+def fleet_conflict_pairs(trajectories, spatial_threshold, temporal_threshold,
+                         max_pairs_per_block=distance.DEFAULT_MAX_PAIRS_PER_BLOCK):
+    """Every sample pair of two different drones closer than spatial_threshold within temporal_threshold.
+
+    All trajectories go into one shared space-time index, which is then queried with the
+    fleet's own samples. Returns (drone_a, point_a, drone_b, point_b, separation, time_a, time_b)
+    arrays with drone_a < drone_b, so each pair appears once; point_* are indices within each
+    trajectory and time_* their timestamps.
+    """
+    index = spatial_index.SpatialIndex.from_arrays(
+        [t.coordinates() for t in trajectories], [t.timestamp for t in trajectories],
+        spatial_threshold, time_bucket=max(temporal_threshold, 1))
+    owner = np.repeat(np.arange(len(trajectories)), np.diff(index.offsets))
+
+    # Query points per index query, so each block looks up about max_pairs_per_block cells;
+    # same-drone matches are dropped after each block
+    block = max(1, max_pairs_per_block // index.neighbour_count(spatial_threshold, temporal_threshold))
+    query_ids, point_ids = [], []
+    for start in range(0, len(index.coords), block):
+        end = min(start + block, len(index.coords))
+        q, p = index.query_space_time(index.coords[start:end], index.times[start:end],
+                                      spatial_threshold, temporal_threshold, max_pairs_per_block)
+        q += start
+        # Each cross-drone pair is found from both sides; keep one, and no drone against itself
+        keep = owner[q] < owner[p]
+        query_ids.append(q[keep])
+        point_ids.append(p[keep])
+
+    q = np.concatenate(query_ids) if query_ids else np.empty(0, dtype=np.int64)
+    p = np.concatenate(point_ids) if point_ids else np.empty(0, dtype=np.int64)
+    separation = distance.distance_3d(index.coords[q, 0], index.coords[q, 1], index.coords[q, 2],
+                                      index.coords[p, 0], index.coords[p, 1], index.coords[p, 2])
+    return (owner[q], q - index.offsets[owner[q]], owner[p], p - index.offsets[owner[p]], separation,
+            index.times[q], index.times[p])
+
+
+def fleet_conflict_graph(paths, spatial_threshold, temporal_threshold,
+                         max_pairs_per_block=distance.DEFAULT_MAX_PAIRS_PER_BLOCK):
+    """Conflict graph of a whole fleet, keyed by drone name (Path.name).
+
+    graph[a][b] describes the conflict of drone a with drone b: number of conflicting sample
+    pairs, minimum separation in meters, and the first and last time of a's samples in
+    conflict. graph[b][a] is the same conflict seen from b, with b's times. Every drone is a
+    key, with an empty dict if it has no conflicts.
+    """
+    names = [p.name for p in paths]
+    if None in names or len(set(names)) != len(names):
+        raise ValueError("All-pairs deconfliction needs a unique name for every path")
+
+    drone_a, _, drone_b, _, separation, time_a, time_b = fleet_conflict_pairs(
+        [p.trajectory for p in paths], spatial_threshold, temporal_threshold, max_pairs_per_block)
+
+    graph = {name: {} for name in names}
+    order = np.lexsort((drone_b, drone_a))
+    drone_a, drone_b, separation = drone_a[order], drone_b[order], separation[order]
+    time_a, time_b = time_a[order], time_b[order]
+    bounds = np.flatnonzero((np.diff(drone_a) != 0) | (np.diff(drone_b) != 0)) + 1
+    for group in np.split(np.arange(len(drone_a)), bounds):
+        if len(group) == 0:
+            continue
+        a, b = names[drone_a[group[0]]], names[drone_b[group[0]]]
+        for first, second, times in ((a, b, time_a), (b, a, time_b)):
+            graph[first][second] = {
+                'pairs': len(group),
+                'min_separation': float(separation[group].min()),
+                'start_time': float(times[group].min()),
+                'end_time': float(times[group].max())
+            }
+    return graph
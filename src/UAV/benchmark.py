@@ -0,0 +1,109 @@
+import argparse
+import json
+import os
+import time
+import tracemalloc
+import pandas as pd
+import deconflict
+import instrumentation
+import intervals
+import path
+import synthetic
+
+
+def prepare_fleet(work_dir, num_drones, seed, options):
+    """Generates the synthetic fleet for one size, reusing it if it already exists with the same settings."""
+    folder = os.path.join(work_dir, f"fleet_{num_drones}")
+    settings = {'num_drones': num_drones, 'seed': seed, **{k: list(v) if isinstance(v, tuple) else v for k, v in options.items()}}
+    marker = os.path.join(folder, 'settings.json')
+    if os.path.exists(marker):
+        with open(marker) as file:
+            if json.load(file) == settings:
+                return folder
+
+    synthetic.generate_fleet(folder, num_drones, seed, **options)
+    synthetic.generate_primary(os.path.join(folder, 'primary_drone.csv'), os.path.join(folder, 'primary_drone.json'),
+                               seed, **options)
+    with open(marker, 'w') as file:
+        json.dump(settings, file)
+    return folder
+
+
+def run_case(folder, spatial_threshold, temporal_threshold, method, sample_interval):
+    """Runs load, interpolation and detection on one fleet folder and returns the measurements."""
+    tracemalloc.start()
+    report = {}
+
+    # Load: parse every CSV/JSON pair into arrays
+    start = time.perf_counter()
+    paths = path.Paths(folder, os.path.join(folder, 'primary_drone.csv'), os.path.join(folder, 'primary_drone.json'),
+                       sample_interval=sample_interval, lazy=True)
+    missions = []
+    for csv_file, json_file in paths.find_sim_files():
+        with open(json_file) as file:
+            window = json.load(file)
+        missions.append((pd.read_csv(csv_file)[['lat', 'long', 'alt']].to_numpy(dtype=float),
+                         window['T_start'], window['T_end'], os.path.splitext(os.path.basename(csv_file))[0]))
+    report['load_s'] = time.perf_counter() - start
+
+    # Interpolation: build the time-driven trajectories
+    start = time.perf_counter()
+    paths.sim_paths = [path.Path.from_waypoints(coords, t_start, t_end, sample_interval, name)
+                       for coords, t_start, t_end, name in missions]
+    report['interpolate_s'] = time.perf_counter() - start
+
+    # Detection
+    start = time.perf_counter()
+    metrics = instrumentation.Instrumentation()
+    result = deconflict.Deconflict(paths, spatial_threshold, temporal_threshold, method=method,
+                                   instrumentation=metrics, verbose=False)
+    report['detect_s'] = time.perf_counter() - start
+
+    report['peak_memory_mb'] = tracemalloc.get_traced_memory()[1] / 2**20
+    tracemalloc.stop()
+
+    primary_samples = len(paths.primary_path.trajectory)
+    sim_samples = sum(len(sim_path.trajectory) for sim_path in paths.sim_paths)
+    # Pair space a brute-force primary x sim comparison would have covered, and the pairs
+    # (sample or segment) whose distance detection actually evaluated after pruning
+    report['covered_pairs'] = primary_samples * sim_samples
+    report['covered_pairs_per_s'] = report['covered_pairs'] / max(report['detect_s'], 1e-9)
+    report['distance_evaluations'] = metrics.counters.get('distance_evaluations', 0)
+    report['evaluations_per_s'] = report['distance_evaluations'] / max(report['detect_s'], 1e-9)
+    report['sim_samples'] = sim_samples
+    report['conflicting_drones'] = len(intervals.conflicting_drones(result.spatial_temporal_conflict_results))
+    report['conflict_intervals'] = len(result.spatial_temporal_conflict_results)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Path, Paths and Deconflict on synthetic fleets.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 1000, 10000])
+    parser.add_argument('--work-dir', default='benchmark_data', help="where generated fleets are kept")
+    parser.add_argument('--spatial-threshold', type=float, default=5.0)
+    parser.add_argument('--temporal-threshold', type=float, default=5.0)
+    parser.add_argument('--method', choices=['points', 'segments'], default='points')
+    parser.add_argument('--sample-interval', type=float, default=1.0)
+    parser.add_argument('--json', help="also write the results to this JSON file")
+    synthetic.add_mission_arguments(parser)
+    args = parser.parse_args()
+
+    options = synthetic.mission_options(args)
+    results = []
+    print(f"{'drones':>8} {'load s':>9} {'interp s':>9} {'detect s':>9} {'peak MB':>9} {'evals':>10} {'evals/s':>10} {'covered/s':>10} {'conflicts':>9}")
+    for num_drones in args.sizes:
+        folder = prepare_fleet(args.work_dir, num_drones, args.seed, options)
+        report = run_case(folder, args.spatial_threshold, args.temporal_threshold, args.method, args.sample_interval)
+        report['drones'] = num_drones
+        results.append(report)
+        print(f"{num_drones:>8} {report['load_s']:>9.3f} {report['interpolate_s']:>9.3f} {report['detect_s']:>9.3f} "
+              f"{report['peak_memory_mb']:>9.1f} {report['distance_evaluations']:>10} {report['evaluations_per_s']:>10.3g} "
+              f"{report['covered_pairs_per_s']:>10.3g} {report['conflicting_drones']:>9}")
+
+    if args.json:
+        with open(args.json, 'w') as file:
+            json.dump({'settings': vars(args), 'results': results}, file, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+import numpy as np
+import distance
+
+# Columns of the box corner arrays
+BOX_COLUMNS = ('lat', 'long', 'alt', 'time')
+
+
+class BoundingVolume:
+    """Space-time boxes around a path: one per leg between consecutive waypoints.
+
+    lower and upper are (K, 4) arrays of lat, long, alt, time corners. Positions are
+    interpolated linearly between waypoints, so every sample of the path lies in the box
+    of its leg.
+    """
+    __slots__ = ('lower', 'upper')
+
+    def __init__(self, lower, upper):
+        self.lower = np.asarray(lower, dtype=np.float64).reshape(-1, 4)
+        self.upper = np.asarray(upper, dtype=np.float64).reshape(-1, 4)
+
+    def __len__(self):
+        return len(self.lower)
+
+    @classmethod
+    def from_waypoints(cls, waypoints, start_time, end_time):
+        """Boxes for a waypoints Trajectory flown from start_time to end_time."""
+        corners = np.column_stack((waypoints.lat, waypoints.long, waypoints.alt, waypoints.timestamp))
+        if len(corners) < 2:
+            corners = np.repeat(corners, 2, axis=0)
+        lower = np.minimum(corners[:-1], corners[1:])
+        upper = np.maximum(corners[:-1], corners[1:])
+        # The path exists for its whole mission window, also before/after the first/last waypoint time
+        lower[0, 3] = min(lower[0, 3], start_time)
+        upper[-1, 3] = max(upper[-1, 3], end_time)
+        return cls(lower, upper)
+
+    def union(self):
+        """Single box around the whole path."""
+        return BoundingVolume(self.lower.min(axis=0), self.upper.max(axis=0))
+
+
+def may_conflict(lower1, upper1, lower2, upper2, spatial_threshold, temporal_threshold):
+    """Whether boxes (broadcasting (..., 4) corner arrays) may hold a pair within the thresholds.
+
+    False only when the boxes are more than temporal_threshold seconds apart, or at least
+    spatial_threshold meters apart (see space_gap()).
+    """
+    lower1, upper1, lower2, upper2 = np.broadcast_arrays(lower1, upper1, lower2, upper2)
+    time_gap = np.maximum(0, np.maximum(lower2[..., 3] - upper1[..., 3], lower1[..., 3] - upper2[..., 3]))
+    return (time_gap <= temporal_threshold) & (space_gap(lower1, upper1, lower2, upper2) < spatial_threshold)
+
+
+def space_gap(lower1, upper1, lower2, upper2):
+    """Lower bound in meters of the distance between boxes (broadcasting (..., 3+) lat/long/alt corner arrays).
+
+    Box gaps are measured in the local projected frame and divided by the projection's
+    worst stretch, so they never overestimate the true distance.
+    """
+    lower1, upper1, lower2, upper2 = np.broadcast_arrays(lower1, upper1, lower2, upper2)
+    lat_min = min(lower1[..., 0].min(initial=90), lower2[..., 0].min(initial=90))
+    lat_max = max(upper1[..., 0].max(initial=-90), upper2[..., 0].max(initial=-90))
+    origin = (0.5 * (lat_min + lat_max), float(lower1[..., 1].ravel()[0]) if lower1.size else 0.0)
+    slack = distance.projection_scale_slack(origin[0], lat_min, lat_max)
+
+    # project_local is monotonic per axis, so projected corners bound the projected box
+    def project(corners):
+        return distance.project_local(corners[..., :3].reshape(-1, 3), origin).reshape(corners.shape[:-1] + (3,))
+
+    low1, high1, low2, high2 = project(lower1), project(upper1), project(lower2), project(upper2)
+    separation = np.maximum(0, np.maximum(low2 - high1, low1 - high2))
+    return np.sqrt((separation ** 2).sum(axis=-1)) / slack
+
+
+def conflicting_legs(primary_lower, primary_upper, sim_lower, sim_upper, spatial_threshold, temporal_threshold,
+                     max_pairs_per_block=distance.DEFAULT_MAX_PAIRS_PER_BLOCK):
+    """(primary legs, sim legs) boolean masks of the legs whose box may conflict with some leg of the other side.
+
+    Every primary leg box is compared with every sim leg box, in blocks of bounded size.
+    """
+    primary_legs = np.zeros(len(primary_lower), dtype=bool)
+    sim_legs = np.zeros(len(sim_lower), dtype=bool)
+    block = max(1, max_pairs_per_block // max(1, len(primary_lower)))
+    for start in range(0, len(sim_lower), block):
+        end = start + block
+        close = may_conflict(primary_lower[:, None], primary_upper[:, None], sim_lower[None, start:end],
+                             sim_upper[None, start:end], spatial_threshold, temporal_threshold)
+        sim_legs[start:end] = close.any(axis=0)
+        primary_legs |= close.any(axis=1)
+    return primary_legs, sim_legs
+
+
+def samples_on_legs(waypoint_times, timestamps, legs):
+    """Indices of the samples lying on any selected leg (legs: boolean per leg).
+
+    A sample exactly at a waypoint time belongs to every leg touching that time.
+    """
+    last = len(legs) - 1
+    right = np.clip(np.searchsorted(waypoint_times, timestamps, side='right') - 1, 0, last)
+    left = np.clip(np.searchsorted(waypoint_times, timestamps, side='left') - 1, 0, last)
+    # Any selected leg from left to right, via a running count of selected legs
+    selected = np.concatenate(([0], np.cumsum(legs)))
+    return np.flatnonzero(selected[right + 1] > selected[left])
@@ -0,0 +1,78 @@
+import hashlib
+import glob
+import os
+import zipfile
+import numpy as np
+import trajectory
+
+# Bump whenever the cached layout or the interpolation itself changes
+CACHE_VERSION = 2
+
+
+def fleet_key(source_files, sample_interval):
+    """Cache key for a fleet: source file names, sizes and mtimes plus interpolation parameters.
+
+    The key is '<source>-<state>': source covers the file names and parameters, state the
+    sizes and mtimes, so a changed fleet keeps its source part. Only os.stat() is needed,
+    so checking an unchanged fleet never reads the source files.
+    """
+    source = hashlib.sha1(f"v{CACHE_VERSION}|{float(sample_interval)!r}".encode())
+    state = hashlib.sha1()
+    for file in source_files:
+        stat = os.stat(file)
+        source.update(f"|{os.path.abspath(file)}".encode())
+        state.update(f"|{stat.st_size}|{stat.st_mtime_ns}".encode())
+    return f"{source.hexdigest()}-{state.hexdigest()}"
+
+
+def _cache_file(cache_dir, key):
+    return os.path.join(cache_dir, f"fleet_{key}.npz")
+
+
+def _pack(trajectories):
+    """Concatenates trajectories into one (N, 4) array plus an offsets table."""
+    lengths = [len(t) for t in trajectories]
+    offsets = np.concatenate(([0], np.cumsum(lengths))).astype(np.int64)
+    if not trajectories:
+        return np.empty((0, 4)), offsets
+    data = np.concatenate([np.column_stack((t.lat, t.long, t.alt, t.timestamp)) for t in trajectories])
+    return data, offsets
+
+
+def _unpack(data, offsets):
+    return [trajectory.Trajectory(*data[start:end].T) for start, end in zip(offsets[:-1], offsets[1:])]
+
+
+def load_fleet(cache_dir, key):
+    """Returns the cached (waypoints, trajectories, start_times, end_times, names) for key, or None on a miss."""
+    try:
+        with np.load(_cache_file(cache_dir, key)) as cached:
+            waypoints = _unpack(cached['waypoints'], cached['waypoint_offsets'])
+            trajectories = _unpack(cached['trajectories'], cached['trajectory_offsets'])
+            return (waypoints, trajectories, cached['start_times'].tolist(), cached['end_times'].tolist(),
+                    cached['names'].tolist())
+    except (OSError, KeyError, ValueError, zipfile.BadZipFile):
+        # Missing, stale or unreadable cache files are simply rebuilt
+        return None
+
+
+def store_fleet(cache_dir, key, paths):
+    """Writes the waypoints and interpolated trajectories of paths under key, replacing older entries of the same source."""
+    os.makedirs(cache_dir, exist_ok=True)
+    waypoints, waypoint_offsets = _pack([path.waypoints for path in paths])
+    trajectories, trajectory_offsets = _pack([path.trajectory for path in paths])
+
+    target = _cache_file(cache_dir, key)
+    temp = target + ".tmp.npz"
+    np.savez(temp, waypoints=waypoints, waypoint_offsets=waypoint_offsets,
+             trajectories=trajectories, trajectory_offsets=trajectory_offsets,
+             start_times=np.array([path.start_time for path in paths]),
+             end_times=np.array([path.end_time for path in paths]),
+             names=np.array([path.name or '' for path in paths], dtype=str))
+    os.replace(temp, target)  # Atomic, so a crash never leaves a half-written cache
+
+    # Earlier states of the same fleet are stale; other fleets sharing cache_dir keep theirs
+    source = key.split('-')[0]
+    for old in glob.glob(os.path.join(cache_dir, f"fleet_{source}-*.npz")):
+        if old != target:
+            os.remove(old)
@@ -0,0 +1,135 @@
+import argparse
+import json
+import sys
+import time
+import all_pairs
+import deconflict
+import instrumentation
+import intervals
+import path
+
+# Headless entry point: only numeric dependencies are imported (no tkinter, no matplotlib)
+
+
+def conflict_report(deconflict_obj):
+    """JSON-ready list with one entry per conflict interval.
+
+    Each entry has the sim path index (and name, when the fleet is loaded), the primary time
+    window of the interval, the number of conflicting pairs merged into it, and the minimum
+    separation in meters with the times and locations of both drones at that closest approach.
+    """
+    sim_paths = deconflict_obj.sim_paths
+    names = [sim_path.name for sim_path in sim_paths] if sim_paths is not None else None
+    return intervals.to_records(deconflict_obj.spatial_temporal_conflict_results, names)
+
+
+def check(paths, spatial_threshold=5, temporal_threshold=5, method='points', workers=None, chunk_size=None,
+          metrics=None, fast_check=False):
+    """Runs Deconflict on a loaded Paths object and returns the result as a JSON-ready dict.
+
+    With fast_check, only the first conflicting sim drone found is reported.
+    """
+    start = time.perf_counter()
+    result = deconflict.Deconflict(paths, spatial_threshold, temporal_threshold, method=method, workers=workers,
+                                   chunk_size=chunk_size, instrumentation=metrics, verbose=False,
+                                   fast_check=fast_check)
+    report = {
+        'conflict': bool(result.conflict_bool),
+        'spatial_threshold': spatial_threshold,
+        'temporal_threshold': temporal_threshold,
+        'method': method,
+        'conflicts': conflict_report(result),
+        'detect_s': time.perf_counter() - start
+    }
+    if metrics is not None:
+        report['metrics'] = metrics.report()
+    return report
+
+
+def run(primaries, sim_data_path='data/', fleet_file=None, cache_dir=None, sample_interval=1.0,
+        spatial_threshold=5, temporal_threshold=5, method='points', workers=None, chunk_size=None, collect_metrics=False,
+        fast_check=False):
+    """Checks each (csv, json) primary mission against the same sim fleet, yielding one report per mission.
+
+    The sim fleet is loaded once and reused for every primary mission (or streamed once per
+    mission when chunk_size is given).
+    """
+    paths = None
+    for primary_csv, primary_json in primaries:
+        metrics = instrumentation.Instrumentation() if collect_metrics else None
+        if paths is None:
+            paths = path.Paths(sim_data_path, primary_csv, primary_json, sample_interval, cache_dir=cache_dir,
+                               fleet_file=fleet_file, lazy=chunk_size is not None, instrumentation=metrics)
+        else:
+            paths.primary_path = path.Path(primary_csv, primary_json, sample_interval)
+        report = check(paths, spatial_threshold, temporal_threshold, method, workers, chunk_size, metrics, fast_check)
+        yield {'primary_csv': primary_csv, 'primary_json': primary_json, **report}
+
+
+def run_all_pairs(primaries=(), sim_data_path='data/', fleet_file=None, cache_dir=None, sample_interval=1.0,
+                  spatial_threshold=5, temporal_threshold=5):
+    """Checks every pair of drones in the sim fleet plus the given primary missions; returns one report."""
+    start = time.perf_counter()
+    paths = path.Paths(sim_data_path, None, None, sample_interval, cache_dir=cache_dir, fleet_file=fleet_file)
+    fleet_paths = paths.sim_paths + [path.Path(primary_csv, primary_json, sample_interval)
+                                     for primary_csv, primary_json in primaries]
+    graph = all_pairs.fleet_conflict_graph(fleet_paths, spatial_threshold, temporal_threshold)
+    return {
+        'conflict': any(graph.values()),
+        'spatial_threshold': spatial_threshold,
+        'temporal_threshold': temporal_threshold,
+        'drones': len(fleet_paths),
+        'graph': graph,
+        'detect_s': time.perf_counter() - start
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Check primary missions against the sim fleet without the GUI. Prints one JSON object per "
+                    "mission; the exit status is 1 if any mission has a conflict, 0 otherwise.")
+    parser.add_argument('--primary', nargs=2, action='append', default=[], metavar=('CSV', 'JSON'),
+                        help="primary mission waypoints and time window (repeat to check several missions)")
+    parser.add_argument('--all-pairs', action='store_true',
+                        help="check every pair of drones in the fleet (and the primary missions) in one pass, "
+                             "printing a single conflict graph keyed by drone name")
+    parser.add_argument('--sim-data', default='data/', help="folder with sim_drone_*.csv/.json files")
+    parser.add_argument('--fleet-file', help="read the sim fleet from this fleet file instead (see fleet.py)")
+    parser.add_argument('--cache-dir', help="reuse interpolated sim trajectories cached in this folder")
+    parser.add_argument('--spatial-threshold', type=float, default=5.0)
+    parser.add_argument('--temporal-threshold', type=float, default=5.0)
+    parser.add_argument('--method', choices=['points', 'segments'], default='points')
+    parser.add_argument('--sample-interval', type=float, default=1.0)
+    parser.add_argument('--workers', type=int, help="process pool size for point comparisons")
+    parser.add_argument('--chunk-size', type=int, help="stream the sim fleet this many drones at a time")
+    parser.add_argument('--fast', action='store_true',
+                        help="only answer whether each route is clear, stopping at the first conflicting drone")
+    parser.add_argument('--metrics', action='store_true', help="include stage timings and counters")
+    parser.add_argument('--output', help="write the results to this file instead of stdout")
+    args = parser.parse_args(argv)
+    if not args.primary and not args.all_pairs:
+        parser.error("give at least one --primary mission, or --all-pairs")
+
+    output = open(args.output, 'w') if args.output else sys.stdout
+    any_conflict = False
+    try:
+        if args.all_pairs:
+            report = run_all_pairs(args.primary, args.sim_data, args.fleet_file, args.cache_dir,
+                                   args.sample_interval, args.spatial_threshold, args.temporal_threshold)
+            output.write(json.dumps(report) + "\n")
+            return 1 if report['conflict'] else 0
+
+        for report in run(args.primary, args.sim_data, args.fleet_file, args.cache_dir, args.sample_interval,
+                          args.spatial_threshold, args.temporal_threshold, args.method, args.workers,
+                          args.chunk_size, args.metrics, args.fast):
+            any_conflict = any_conflict or report['conflict']
+            output.write(json.dumps(report) + "\n")
+            output.flush()
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    return 1 if any_conflict else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
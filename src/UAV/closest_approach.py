@@ -0,0 +1,264 @@
+import numpy as np
+import distance
+
+
+class Segments:
+    def __init__(self, paths):
+        """Time-parameterized straight segments between the original waypoints of each path.
+
+        Stores, for every segment, its start/end time and start/end lat/long/alt, plus the
+        index of the path it belongs to. A path with a single waypoint becomes one
+        stationary segment spanning its whole time window; a segment without duration
+        stays at its end point.
+        """
+        owners, times, coords = [], [], []
+        for i, path in enumerate(paths):
+            path_coords = path.waypoints.coordinates()
+            path_times = path.waypoints.timestamp
+            if len(path_coords) == 1:
+                path_coords = np.repeat(path_coords, 2, axis=0)
+                path_times = np.array([path.start_time, path.end_time], dtype=float)
+
+            owners.append(np.full(len(path_coords) - 1, i, dtype=np.int64))
+            times.append(np.stack((path_times[:-1], path_times[1:]), axis=1))
+            coords.append(np.stack((path_coords[:-1], path_coords[1:]), axis=1))
+
+        self.owner = np.concatenate(owners) if owners else np.empty(0, dtype=np.int64)
+        self.times = np.concatenate(times) if times else np.empty((0, 2))  # (S, 2) start/end time
+        self.coords = np.concatenate(coords) if coords else np.empty((0, 2, 3))  # (S, 2, 3) start/end lat/long/alt
+        # A segment without duration is a jump; like the np.interp sampling of Path.resample(),
+        # the drone is at its end point at that instant
+        zero_span = self.times[:, 1] <= self.times[:, 0]
+        self.coords[zero_span, 0] = self.coords[zero_span, 1]
+        # Index of each segment within its own path
+        first = np.concatenate(([0], np.flatnonzero(np.diff(self.owner)) + 1)) if len(self.owner) else np.empty(0, dtype=np.int64)
+        self.local_index = np.arange(len(self.owner)) - np.repeat(first, np.diff(np.append(first, len(self.owner))))
+
+    def __len__(self):
+        return len(self.owner)
+
+    def position(self, segment_ids, t):
+        """Linearly interpolated lat/long/alt of the given segments at times t."""
+        t0, t1 = self.times[segment_ids, 0], self.times[segment_ids, 1]
+        span = t1 - t0
+        fraction = np.divide(t - t0, span, out=np.zeros_like(span), where=span > 0)
+        start, end = self.coords[segment_ids, 0], self.coords[segment_ids, 1]
+        return start + fraction[:, None] * (end - start)
+
+
+def _edge_minimum(w0, w1, lo, hi):
+    """Minimizes |w0 + w1 * s|^2 for s in [lo, hi]; returns (squared distance, s), inf where empty."""
+    w1_sq = np.einsum('ij,ij->i', w1, w1)
+    s = np.divide(-np.einsum('ij,ij->i', w0, w1), w1_sq, out=lo.copy(), where=w1_sq > 0)
+    s = np.clip(s, lo, hi)
+    w = w0 + w1 * s[:, None]
+    value = np.einsum('ij,ij->i', w, w)
+    return np.where(lo <= hi, value, np.inf), s
+
+
+def segment_pair_minimum(p_start, p_velocity, a0, a1, q_start, q_velocity, b0, b1, time_window):
+    """Exact minimum separation between two linearly moving points, vectorized over pairs.
+
+    The primary point is at p_start + p_velocity * (tau - a0) for tau in [a0, a1], the sim
+    point at q_start + q_velocity * (sigma - b0) for sigma in [b0, b1] (metric frame). Pairs
+    of times with |tau - sigma| <= time_window are considered, matching the point-wise
+    spatial-temporal test. The squared distance is a convex quadratic in (tau, sigma), so
+    the minimum over that convex polygon is either the interior stationary point or lies on
+    one of its (at most six) edges.
+
+    Returns (separation, tau, sigma) arrays; separation is inf where the windows do not overlap.
+    """
+    c = (p_start - p_velocity * a0[:, None]) - (q_start - q_velocity * b0[:, None])
+    t = np.broadcast_to(np.asarray(time_window, dtype=float), a0.shape)
+
+    best = np.full(len(a0), np.inf)
+    best_tau = a0.copy()
+    best_sigma = b0.copy()
+
+    def consider(value, tau, sigma):
+        better = value < best
+        best[better] = value[better]
+        best_tau[better] = tau[better]
+        best_sigma[better] = sigma[better]
+
+    # Edges tau = a0 and tau = a1 (sigma free)
+    for edge in (a0, a1):
+        lo = np.maximum(b0, edge - t)
+        hi = np.minimum(b1, edge + t)
+        value, s = _edge_minimum(c + p_velocity * edge[:, None], -q_velocity, lo, hi)
+        consider(value, edge, s)
+
+    # Edges sigma = b0 and sigma = b1 (tau free)
+    for edge in (b0, b1):
+        lo = np.maximum(a0, edge - t)
+        hi = np.minimum(a1, edge + t)
+        value, s = _edge_minimum(c - q_velocity * edge[:, None], p_velocity, lo, hi)
+        consider(value, s, edge)
+
+    # Edges sigma = tau - t and sigma = tau + t (tau free)
+    for shift in (-t, t):
+        lo = np.maximum(a0, b0 - shift)
+        hi = np.minimum(a1, b1 - shift)
+        value, s = _edge_minimum(c - q_velocity * shift[:, None], p_velocity - q_velocity, lo, hi)
+        consider(value, s, s + shift)
+
+    # Interior stationary point of |c + u tau - v sigma|^2
+    uu = np.einsum('ij,ij->i', p_velocity, p_velocity)
+    vv = np.einsum('ij,ij->i', q_velocity, q_velocity)
+    uv = np.einsum('ij,ij->i', p_velocity, q_velocity)
+    uc = np.einsum('ij,ij->i', p_velocity, c)
+    vc = np.einsum('ij,ij->i', q_velocity, c)
+    det = uu * vv - uv**2
+    regular = det > 1e-12 * np.maximum(uu * vv, 1e-300)
+    safe_det = np.where(regular, det, 1.0)
+    tau = (-uc * vv + vc * uv) / safe_det
+    sigma = (uv * -uc + uu * vc) / safe_det
+    feasible = (regular & (tau >= a0) & (tau <= a1) & (sigma >= b0) & (sigma <= b1)
+                & (np.abs(tau - sigma) <= t))
+    w = c + p_velocity * tau[:, None] - q_velocity * sigma[:, None]
+    consider(np.where(feasible, np.einsum('ij,ij->i', w, w), np.inf), tau, sigma)
+
+    return np.sqrt(best), best_tau, best_sigma
+
+
+def conflict_span(p_start, p_velocity, a0, a1, q_start, q_velocity, b0, b1, time_window, spatial_threshold, tau):
+    """Primary time span during which each segment pair is in conflict.
+
+    A primary time is in conflict if some sim time within time_window of it (and on the sim
+    segment) puts the two points within spatial_threshold, as in the point-wise test. The
+    pairs of times within the threshold are an ellipse cut by the same polygon as in
+    segment_pair_minimum(), so the earliest and latest primary times lie on the ellipse where
+    it is tangent to the sim-time direction, where it crosses a polygon edge, or at a
+    polygon corner inside it. Returns (start, end) arrays, both at least covering tau (the
+    closest approach, which may be kept only by the projection margin).
+    """
+    c = (p_start - p_velocity * a0[:, None]) - (q_start - q_velocity * b0[:, None])
+    t = np.broadcast_to(np.asarray(time_window, dtype=float), a0.shape)
+    limit = spatial_threshold ** 2
+    start, end = tau.copy(), tau.copy()
+
+    def consider(x, y, ok):
+        ok = (ok & (x >= a0 - 1e-6) & (x <= a1 + 1e-6) & (y >= b0 - 1e-6) & (y <= b1 + 1e-6)
+              & (np.abs(x - y) <= t + 1e-6))
+        np.minimum(start, np.where(ok, x, np.inf), out=start)
+        np.maximum(end, np.where(ok, x, -np.inf), out=end)
+
+    def crossings(x0, dx, y0, dy, ok=True):
+        # Points (x0 + dx s, y0 + dy s) where |c + u x - v y| = spatial_threshold
+        w0 = c + p_velocity * x0[:, None] - q_velocity * y0[:, None]
+        w1 = p_velocity * dx[:, None] - q_velocity * dy[:, None]
+        qa = np.einsum('ij,ij->i', w1, w1)
+        qb = 2 * np.einsum('ij,ij->i', w0, w1)
+        qc = np.einsum('ij,ij->i', w0, w0) - limit
+        disc = qb ** 2 - 4 * qa * qc
+        real = ok & (qa > 0) & (disc >= 0)
+        root = np.sqrt(np.where(real, disc, 0))
+        safe_qa = np.where(real, 2 * qa, 1.0)
+        for sign in (-1, 1):
+            s = (-qb + sign * root) / safe_qa
+            consider(x0 + dx * s, y0 + dy * s, real)
+
+    zero, one = np.zeros_like(a0), np.ones_like(a0)
+    # Edges tau = a0, a1; sigma = b0, b1; sigma = tau -/+ t
+    for edge in (a0, a1):
+        crossings(edge, zero, zero, one)
+    for edge in (b0, b1):
+        crossings(zero, one, edge, zero)
+    for shift in (-t, t):
+        crossings(zero, one, shift, one)
+    # Tangent points: sigma at its unconstrained minimum for each tau
+    vv = np.einsum('ij,ij->i', q_velocity, q_velocity)
+    moving = vv > 0
+    safe_vv = np.where(moving, vv, 1.0)
+    crossings(zero, one, np.einsum('ij,ij->i', q_velocity, c) / safe_vv,
+              np.einsum('ij,ij->i', q_velocity, p_velocity) / safe_vv, moving)
+    # Polygon corners inside the ellipse
+    for x, y in ((a0, b0), (a0, b1), (a1, b0), (a1, b1), (a0, a0 - t), (a0, a0 + t), (a1, a1 - t), (a1, a1 + t),
+                 (b0 + t, b0), (b0 - t, b0), (b1 + t, b1), (b1 - t, b1)):
+        w = c + p_velocity * x[:, None] - q_velocity * y[:, None]
+        consider(x, y, np.einsum('ij,ij->i', w, w) <= limit)
+    return start, end
+
+
+def closest_approaches(primary_path, sim_paths, spatial_threshold, temporal_threshold,
+                       max_pairs_per_block=distance.DEFAULT_MAX_PAIRS_PER_BLOCK, count_query=None):
+    """Finds every primary/sim segment pair whose minimum separation is below spatial_threshold.
+
+    Only segment pairs whose time windows overlap within temporal_threshold are evaluated.
+    Returns a dict of arrays: sim_path, primary_segment, sim_segment, separation,
+    primary_time and sim_time (times of closest approach), primary_location and
+    sim_location (lat/long/alt at those times), and primary_start and primary_end (the
+    primary time span in conflict, see conflict_span()). count_query, if given, is called
+    with {'distance_evaluations': segment pairs evaluated} after each block.
+    """
+    primary = Segments([primary_path])
+    sims = Segments(sim_paths)
+
+    # Common metric frame for the straight-line motion model
+    origin = tuple(primary.coords[:, 0, :2].mean(axis=0)) if len(primary) else (0.0, 0.0)
+    # Any conflicting sim point lies within spatial_threshold of the primary's latitude band
+    # (about 110 km per degree), so the frame's scale error is bounded over that band
+    lat_pad = 2 * spatial_threshold / 110000.0
+    lat_min = primary.coords[..., 0].min() - lat_pad if len(primary) else 0.0
+    lat_max = primary.coords[..., 0].max() + lat_pad if len(primary) else 0.0
+    slack = distance.projection_scale_slack(origin[0], lat_min, lat_max)
+    p_xyz = distance.project_local(primary.coords.reshape(-1, 3), origin).reshape(-1, 2, 3)
+    q_xyz = distance.project_local(sims.coords.reshape(-1, 3), origin).reshape(-1, 2, 3)
+    # Times relative to the primary start keep the motion model well conditioned
+    t_ref = primary.times[0, 0] if len(primary) else 0.0
+    p_times = primary.times - t_ref
+    q_times = sims.times - t_ref
+    p_span = primary.times[:, 1] - primary.times[:, 0]
+    q_span = sims.times[:, 1] - sims.times[:, 0]
+    p_velocity = np.divide(p_xyz[:, 1] - p_xyz[:, 0], p_span[:, None], out=np.zeros((len(primary), 3)), where=p_span[:, None] > 0)
+    q_velocity = np.divide(q_xyz[:, 1] - q_xyz[:, 0], q_span[:, None], out=np.zeros((len(sims), 3)), where=q_span[:, None] > 0)
+
+    found = {key: [] for key in ('primary_segment', 'sim_segment', 'separation', 'primary_time', 'sim_time',
+                                 'primary_start', 'primary_end')}
+    rows_per_block = max(1, int(max_pairs_per_block) // max(1, len(sims)))
+    for start in range(0, len(primary), rows_per_block):
+        rows = np.arange(start, min(start + rows_per_block, len(primary)))
+        # Skip segment pairs that are never within temporal_threshold of each other
+        overlap = ((p_times[rows, 0][:, None] <= q_times[None, :, 1] + temporal_threshold)
+                   & (q_times[None, :, 0] <= p_times[rows, 1][:, None] + temporal_threshold))
+        i, j = np.nonzero(overlap)
+        i = rows[i]
+        if len(i) == 0:
+            continue
+
+        if count_query is not None:
+            count_query({'distance_evaluations': len(i)})
+        separation, tau, sigma = segment_pair_minimum(
+            p_xyz[i, 0], p_velocity[i], p_times[i, 0], p_times[i, 1],
+            q_xyz[j, 0], q_velocity[j], q_times[j, 0], q_times[j, 1], temporal_threshold)
+        # Leave room for the projection's stretch, then confirm on the ellipsoid below
+        keep = separation < spatial_threshold * slack + 1e-6
+        i, j, separation, tau, sigma = i[keep], j[keep], separation[keep], tau[keep], sigma[keep]
+        span_start, span_end = conflict_span(
+            p_xyz[i, 0], p_velocity[i], p_times[i, 0], p_times[i, 1],
+            q_xyz[j, 0], q_velocity[j], q_times[j, 0], q_times[j, 1], temporal_threshold, spatial_threshold, tau)
+        for key, value in zip(found, (i, j, separation, tau + t_ref, sigma + t_ref, span_start + t_ref, span_end + t_ref)):
+            found[key].append(value)
+
+    result = {key: np.concatenate(value) if value else np.empty(0) for key, value in found.items()}
+    primary_segment = result['primary_segment'].astype(np.int64)
+    sim_segment = result['sim_segment'].astype(np.int64)
+
+    primary_location = primary.position(primary_segment, result['primary_time'])
+    sim_location = sims.position(sim_segment, result['sim_time'])
+    separation = distance.distance_3d(primary_location[:, 0], primary_location[:, 1], primary_location[:, 2],
+                                      sim_location[:, 0], sim_location[:, 1], sim_location[:, 2])
+    keep = separation < spatial_threshold
+
+    return {
+        'sim_path': sims.owner[sim_segment][keep],
+        'primary_segment': primary_segment[keep],
+        'sim_segment': sims.local_index[sim_segment][keep],
+        'separation': separation[keep],
+        'primary_time': result['primary_time'][keep],
+        'sim_time': result['sim_time'][keep],
+        'primary_location': primary_location[keep],
+        'sim_location': sim_location[keep],
+        'primary_start': result['primary_start'][keep],
+        'primary_end': result['primary_end'][keep],
+    }
@@ -0,0 +1,67 @@
+import numpy as np
+
+# Vertices that deviate less than 1/DEFAULT_RESOLUTION of the scene from the simplified line are dropped
+DEFAULT_RESOLUTION = 2000
+
+
+def scene_span(coordinate_arrays):
+    """Per-axis extent (lat, long, alt) of the scene drawn from these (N, 3) coordinate arrays.
+
+    Axes with no extent get a span of 1, so they never divide by zero.
+    """
+    arrays = [coords for coords in coordinate_arrays if len(coords)]
+    if not arrays:
+        return np.ones(3)
+    lower = np.min([coords.min(axis=0) for coords in arrays], axis=0)
+    upper = np.max([coords.max(axis=0) for coords in arrays], axis=0)
+    span = upper - lower
+    return np.where(span > 0, span, 1.0)
+
+
+def douglas_peucker(points, tolerance, keep=None):
+    """Sorted indices of the vertices of a polyline kept by Douglas-Peucker simplification.
+
+    Every dropped vertex lies within tolerance of the simplified line. The end points and
+    the indices in keep are always kept; the line is split at them first.
+    """
+    n = len(points)
+    kept = np.zeros(n, dtype=bool)
+    if n:
+        kept[0] = kept[-1] = True
+    if keep is not None:
+        kept[np.asarray(keep, dtype=np.int64)] = True
+
+    anchors = np.flatnonzero(kept)
+    pending = list(zip(anchors[:-1], anchors[1:]))
+    while pending:
+        a, b = pending.pop()
+        if b - a < 2:
+            continue
+        chord = points[b] - points[a]
+        offsets = points[a + 1:b] - points[a]
+        length = chord @ chord
+        if length > 0:
+            along = np.clip(offsets @ chord / length, 0, 1)
+            offsets = offsets - along[:, None] * chord
+        deviation = np.einsum('ij,ij->i', offsets, offsets)
+        farthest = int(np.argmax(deviation))
+        if deviation[farthest] > tolerance ** 2:
+            middle = a + 1 + farthest
+            kept[middle] = True
+            pending.extend(((a, middle), (middle, b)))
+    return np.flatnonzero(kept)
+
+
+def decimate(trajectory, span, resolution=DEFAULT_RESOLUTION, keep=None):
+    """Level-of-detail copy of a Trajectory for plotting.
+
+    Coordinates are measured in fractions of the scene span (see scene_span()), as the axes
+    of an auto-scaled plot are, and vertices closer than 1/resolution of the scene to the
+    simplified line are dropped: the shape is unchanged at that screen resolution. Samples
+    in keep (e.g. conflict points) are always kept. Interpolated paths are straight
+    between waypoints, so most samples go.
+    """
+    if len(trajectory) <= 2:
+        return trajectory
+    points = trajectory.coordinates() / span
+    return trajectory[douglas_peucker(points, 1.0 / resolution, keep)]
@@ -1,132 +1,473 @@
-import pandas as pd
+import contextlib
 import numpy as np
-from geopy.distance import geodesic
 import path
+import distance
+import spatial_index
+import closest_approach
+import parallel
+import separation
+import all_pairs
+import bounds
+import intervals
+from instrumentation import NULL_INSTRUMENTATION
+
+# Sim drones per chunk when streaming a lazily loaded fleet
+DEFAULT_CHUNK_SIZE = 1000
+
+# Largest batch of likely drones checked together by find_first_conflict()
+MAX_FAST_CHECK_BATCH = 64
+
+# Conflicting primary samples at most this many sample intervals apart belong to one conflict interval
+MERGE_GAP_SAMPLES = 1.5
 
 class Deconflict:
-    def __init__(self, paths, spatial_threshold = 5,temporal_threshold = 5):
-        """Initialize with a Paths object containing the primary path and multiple sim paths."""
+    def __init__(self, paths, spatial_threshold = 5,temporal_threshold = 5, max_pairs_per_block = distance.DEFAULT_MAX_PAIRS_PER_BLOCK, method = 'points', workers = None, chunk_size = None, profile_horizon = None, instrumentation = None, verbose = True, progress = None, cancel_event = None, fast_check = False):
+        """Initialize with a Paths object containing the primary path and multiple sim paths.
+
+        max_pairs_per_block caps how many point pairs are held in memory at once while
+        comparing the primary path against a sim path.
+
+        method selects how spatial-temporal conflicts are found: 'points' compares the
+        interpolated samples, 'segments' computes the exact closest approach between the
+        straight legs of each path, so fast drones cannot slip between samples.
+
+        workers > 1 spreads the point comparisons over a process pool of that size.
+
+        chunk_size streams the sim fleet through detection that many drones at a time, so
+        only one chunk of trajectories is in memory at once. It is required for Paths
+        loaded with lazy=True (a default chunk size is used if none is given).
+
+        profile_horizon = (max_spatial, max_temporal) builds a SeparationProfile covering
+        thresholds up to those values, so set_thresholds() can answer later threshold
+        changes without recomputing (points mode only).
+
+        instrumentation is an instrumentation.Instrumentation that collects per-stage wall
+        time and point/pair counters; by default nothing is recorded.
+
+        verbose=False skips building and printing the text summary (see get_conflict_summary()).
+
+        progress(sim paths done, distance evaluations so far) is called after each chunk of the
+        sim fleet has been checked. Once cancel_event (e.g. a threading.Event) is set, detection
+        stops at the next chunk boundary; cancelled is then True and the results hold the
+        conflicts found in the chunks checked so far.
+
+        fast_check=True only answers whether the route is clear (conflict_bool): detection
+        stops at the first sim drone found in conflict, see find_first_conflict(), and
+        spatial_temporal_conflict_results holds at most that drone.
+
+        Results (spatial_temporal_conflict_results, spatial_conflict_results) are record
+        arrays of conflict intervals, one row per stretch of time a sim drone is in conflict
+        with the primary: see intervals.INTERVAL_DTYPE.
+        """
+        if method not in ('points', 'segments'):
+            raise ValueError(f"Unknown method: {method}")
+        self.max_pairs_per_block = max_pairs_per_block
+        self.method = method
+        self.workers = workers
+        self.instrumentation = instrumentation if instrumentation is not None else NULL_INSTRUMENTATION
+        self.progress = progress
+        self.cancel_event = cancel_event
+        self.cancelled = False
+        self.query_stats = {}  # Pair counters of the queries of the latest detection (see _count_query())
+        self.fast_check = fast_check
+        self.paths = paths
         self.primary_path = paths.primary_path  # The primary path (self.paths.primary_path)
-        self.sim_paths = paths.sim_paths  # List of simulation paths (self.paths.sim_paths)
-
-        self.spatial_conflict_results = self.check_spatial_conflict(spatial_threshold)
-        self.spatial_temporal_conflict_results = self.check_temporal_spatial_conflict(temporal_threshold)
-        print(self.get_conflict_summary())
-
-    def calculate_3d_distance(self, coord1, coord2):
-        """Calculate the 3D distance between two points considering lat, lon, and alt."""
-        lat1, lon1, alt1 = coord1
-        lat2, lon2, alt2 = coord2
-        
-        # Calculate 2D distance (latitude, longitude)
-        horizontal_distance = geodesic((lat1, lon1), (lat2, lon2)).meters
-        
-        # Calculate vertical distance (altitude)
-        vertical_distance = abs(alt1 - alt2)
-        
-        # Calculate the 3D Euclidean distance
-        distance = np.sqrt(horizontal_distance**2 + vertical_distance**2)
-        
-        return distance
-
-    def find_points_within_threshold(self, df1, df2, spatial_threshold):
-        """Find points within the threshold distance in 3D space (lat, long, alt)."""
-        indices_df1 = []
-        indices_df2 = []
-        
-        # Iterate through all points in df1
-        for i, row1 in df1.iterrows():
-            lat1, lon1, alt1 = row1[['lat', 'long', 'alt']]
-            
-            # Compare with every point in df2
-            for j, row2 in df2.iterrows():
-                lat2, lon2, alt2 = row2[['lat', 'long', 'alt']]
-                
-                # Calculate the 3D distance
-                distance = self.calculate_3d_distance((lat1, lon1, alt1), (lat2, lon2, alt2))
-                
-                # If the distance is less than the threshold, store the indices
-                if distance < spatial_threshold:
-                    indices_df1.append(i)
-                    indices_df2.append(j)
-        
-        return indices_df1, indices_df2
+        self.sim_paths = paths.sim_paths  # List of simulation paths (self.paths.sim_paths), None if lazy
+        if chunk_size is None and self.sim_paths is None:
+            chunk_size = DEFAULT_CHUNK_SIZE
+        self.chunk_size = chunk_size
+
+        self.spatial_threshold = spatial_threshold
+        self.temporal_threshold = temporal_threshold
+
+        # Spatial-only results are computed on first access (e.g. for visualization)
+        self._spatial_conflict_results = None
+        self.profile = None
+        if fast_check:
+            self.spatial_temporal_conflict_results = self.check_first_conflict(spatial_threshold, temporal_threshold)
+        elif profile_horizon is not None and method == 'points':
+            self.build_profile(max(profile_horizon[0], spatial_threshold), max(profile_horizon[1], temporal_threshold))
+            with self.instrumentation.stage('profile_lookup'):
+                self.spatial_temporal_conflict_results = self.profile.intervals(
+                    spatial_threshold, temporal_threshold, self.merge_gap())
+        elif method == 'segments':
+            self.spatial_temporal_conflict_results = self.check_segment_conflict(spatial_threshold, temporal_threshold)
+        else:
+            self.spatial_temporal_conflict_results = self.check_temporal_spatial_conflict(temporal_threshold)
+        if verbose:
+            with self.instrumentation.stage('summary'):
+                summary = self.get_conflict_summary()
+            print(summary)
+        else:
+            self.conflict_bool = len(self.spatial_temporal_conflict_results) > 0
+
+    @property
+    def spatial_conflict_results(self):
+        """Spatial conflicts regardless of time, computed lazily."""
+        if self._spatial_conflict_results is None:
+            self._spatial_conflict_results = self.check_spatial_conflict(self.spatial_threshold)
+        return self._spatial_conflict_results
+
+    def build_profile(self, max_spatial, max_temporal):
+        """Precomputes the minimum-separation profile for thresholds up to the given horizons."""
+        with self.instrumentation.stage('profile'):
+            self.profile = separation.SeparationProfile(
+                self.primary_path, self.sim_chunks(), max_spatial, max_temporal, self.max_pairs_per_block,
+                self._count_query)
+        self.instrumentation.count('profile_pairs', len(self.profile.separation))
+        return self.profile
+
+    def set_thresholds(self, spatial_threshold, temporal_threshold):
+        """Re-evaluates conflicts for new thresholds.
+
+        Answered from the separation profile when it covers the new thresholds, otherwise
+        the detection is rerun.
+        """
+        self.spatial_threshold = spatial_threshold
+        self.temporal_threshold = temporal_threshold
+        self._spatial_conflict_results = None
+        self.cancelled = False
+
+        if self.fast_check:
+            self.spatial_temporal_conflict_results = self.check_first_conflict(spatial_threshold, temporal_threshold)
+        elif self.profile is not None and self.method == 'points' and self.profile.covers(spatial_threshold, temporal_threshold):
+            with self.instrumentation.stage('profile_lookup'):
+                self.spatial_temporal_conflict_results = self.profile.intervals(
+                    spatial_threshold, temporal_threshold, self.merge_gap())
+        elif self.method == 'segments':
+            self.spatial_temporal_conflict_results = self.check_segment_conflict(spatial_threshold, temporal_threshold)
+        else:
+            self.spatial_temporal_conflict_results = self.check_temporal_spatial_conflict(temporal_threshold)
+
+        self.conflict_bool = len(self.spatial_temporal_conflict_results) > 0
+        return self.conflict_bool
+
+    def merge_gap(self):
+        """Largest time gap (seconds) between conflicting primary samples of one conflict interval."""
+        return MERGE_GAP_SAMPLES * self.primary_path.sample_interval
+
+    def check_fleet_conflicts(self, include_primary=True):
+        """Finds conflicts between every pair of drones in the fleet, using the current thresholds.
+
+        Returns (and keeps in self.fleet_conflict_graph) a conflict graph keyed by drone name,
+        see all_pairs.fleet_conflict_graph(). With include_primary the primary path is one of
+        the drones.
+        """
+        fleet_paths = [sim_path for _, chunk in self.sim_chunks() for sim_path in chunk]
+        if include_primary:
+            fleet_paths.append(self.primary_path)
+        with self.instrumentation.stage('all_pairs'):
+            self.fleet_conflict_graph = all_pairs.fleet_conflict_graph(
+                fleet_paths, self.spatial_threshold, self.temporal_threshold, self.max_pairs_per_block)
+        return self.fleet_conflict_graph
+
+    def check_first_conflict(self, spatial_threshold, temporal_threshold):
+        """Conflict intervals of only the first sim drone found in conflict (empty if the route is clear)."""
+        conflict = self.find_first_conflict(spatial_threshold, temporal_threshold)
+        return intervals.empty() if conflict is None else conflict
+
+    def find_first_conflict(self, spatial_threshold, temporal_threshold):
+        """Returns the conflict intervals of the first sim drone found in conflict, or None if the route is clear.
+
+        Within each chunk, drones that cannot conflict are skipped and the rest are checked
+        most likely first (see conflict_likelihood_order()), stopping at the first confirmed
+        conflict; later chunks are then never loaded. Drones are checked in batches that
+        double in size, so a likely conflict is confirmed after one drone while a clear route
+        does not pay per-drone overhead.
+        """
+        for first, sim_paths in self.sim_chunks():
+            with self.instrumentation.stage('likelihood_order'):
+                order = self.conflict_likelihood_order(sim_paths, spatial_threshold, temporal_threshold)
+            self.instrumentation.count('drones_skipped', len(sim_paths) - len(order))
+
+            start, batch_size = 0, 1
+            while start < len(order):
+                batch = order[start:start + batch_size]
+                self.instrumentation.count('drones_examined', len(batch))
+                with self.instrumentation.stage('drone_check'):
+                    conflicts = self.check_drones([sim_paths[i] for i in batch], spatial_threshold, temporal_threshold)
+                if len(conflicts):
+                    # The most likely drone of the batch that is in conflict
+                    conflict = conflicts[conflicts.sim_path == conflicts.sim_path.min()]
+                    conflict.sim_path = first + batch[conflict.sim_path]
+                    return conflict
+                start += batch_size
+                batch_size = min(2 * batch_size, MAX_FAST_CHECK_BATCH)
+        return None
+
+    def conflict_likelihood_order(self, sim_paths, spatial_threshold, temporal_threshold):
+        """Indices of the sim paths that can conflict with the primary path, most likely first.
+
+        Per sim path only the samples within temporal_threshold of the other path's time window
+        are considered. Paths without such samples, or whose bounding box stays at least
+        spatial_threshold from the primary's, cannot conflict and are left out. The rest are
+        ordered by bounding box gap, then by longest time overlap.
+        """
+        primary = self.primary_path.trajectory
+        if len(primary) == 0 or not sim_paths:
+            return np.empty(0, dtype=np.int64)
+        trajectories = [sim_path.trajectory for sim_path in sim_paths]
+        lengths = np.array([len(t) for t in trajectories])
+        offsets = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+        times = np.concatenate([t.timestamp for t in trajectories])
+        sim_start, sim_end = times[offsets], times[offsets + lengths - 1]
+
+        # Sim samples within reach in time of the primary, and primary samples within reach of each sim path
+        in_window = (times >= primary.timestamp[0] - temporal_threshold) & (times <= primary.timestamp[-1] + temporal_threshold)
+        primary_lo = np.searchsorted(primary.timestamp, sim_start - temporal_threshold)
+        primary_hi = np.searchsorted(primary.timestamp, sim_end + temporal_threshold, side='right')
+        possible = (np.add.reduceat(in_window, offsets) > 0) & (primary_lo < primary_hi)
+        ranges = np.where(possible[:, None], np.column_stack((primary_lo, primary_hi)), 0).ravel()
+
+        sim_box, primary_box = [], []
+        for column in ('lat', 'long', 'alt'):
+            values = np.concatenate([getattr(t, column) for t in trajectories])
+            sim_box.append((np.minimum.reduceat(np.where(in_window, values, np.inf), offsets),
+                            np.maximum.reduceat(np.where(in_window, values, -np.inf), offsets)))
+            # One padding element keeps every range end a valid reduceat index
+            padded = np.append(getattr(primary, column), 0.0)
+            primary_box.append((np.minimum.reduceat(padded, ranges)[::2], np.maximum.reduceat(padded, ranges)[::2]))
+
+        sim_min, sim_max, primary_min, primary_max = [np.column_stack([box[k] for box in boxes])[possible]
+                                                       for boxes in (sim_box, primary_box) for k in (0, 1)]
+        gaps = np.full(len(sim_paths), np.inf)
+        gaps[possible] = bounds.space_gap(primary_min, primary_max, sim_min, sim_max)
+        overlaps = np.minimum(primary.timestamp[-1], sim_end) - np.maximum(primary.timestamp[0], sim_start)
+
+        candidates = np.flatnonzero(gaps < spatial_threshold)
+        return candidates[np.lexsort((-overlaps[candidates], gaps[candidates]))]
+
+    def check_drones(self, sim_paths, spatial_threshold, temporal_threshold):
+        """Conflict intervals between the primary path and a few sim paths, sim_path indexing into sim_paths."""
+        if self.method == 'segments':
+            found = closest_approach.closest_approaches(
+                self.primary_path, sim_paths, spatial_threshold, temporal_threshold, self.max_pairs_per_block,
+                self._count_query)
+            return self.segment_intervals(found)
+
+        pairs = [distance.space_time_pairs(self.primary_path.trajectory, sim_path.trajectory, spatial_threshold,
+                                           temporal_threshold, self.max_pairs_per_block) for sim_path in sim_paths]
+        primary_idx = np.concatenate([p for p, _ in pairs])
+        sim_idx = np.repeat(np.arange(len(sim_paths)), [len(p) for p, _ in pairs])
+        return self.pair_intervals(primary_idx, sim_idx, np.concatenate([q for _, q in pairs]), sim_paths)
+
+    def sim_chunks(self):
+        """Yields (index of the first sim path, list of sim paths) covering the whole fleet.
+
+        Reports progress after each chunk and stops early once cancellation is requested.
+        """
+        self.instrumentation.count('primary_points', len(self.primary_path.trajectory))
+        self.query_stats = {}
+        done = 0
+        for first, chunk in self._load_chunks():
+            self.instrumentation.count('sim_paths', len(chunk))
+            self.instrumentation.count('sim_points', sum(len(sim_path.trajectory) for sim_path in chunk))
+            yield first, chunk
+
+            # Resumed once the consumer has finished with the chunk
+            done += len(chunk)
+            if self.progress is not None:
+                self.progress(done, self.query_stats.get('distance_evaluations', 0))
+
+    def _load_chunks(self):
+        if self.chunk_size is None:
+            if not self._cancel_requested():
+                yield 0, self.sim_paths
+            return
+
+        first = 0
+        chunks = iter(self.paths.iter_sim_paths(self.chunk_size))
+        while not self._cancel_requested():
+            # Loading a chunk is timed separately from the detection that consumes it
+            with self.instrumentation.stage('load_chunk'):
+                chunk = next(chunks, None)
+            if chunk is None:
+                return
+            yield first, chunk
+            first += len(chunk)
+
+    def _cancel_requested(self):
+        if self.cancel_event is not None and self.cancel_event.is_set():
+            self.cancelled = True
+        return self.cancelled
+
+    def _count_query(self, stats):
+        """Adds the pair counters of a query (e.g. SpatialIndex.last_query_stats) to the instrumentation and query_stats."""
+        for name, value in stats.items():
+            self.instrumentation.count(name, value)
+            self.query_stats[name] = self.query_stats.get(name, 0) + value
+
+    def conflict_pool(self):
+        """Process pool for one detection with workers > 1 (see parallel.ConflictPool), else a null context."""
+        if self.workers and self.workers > 1:
+            return parallel.ConflictPool(self.primary_path, self.workers, self.max_pairs_per_block)
+        return contextlib.nullcontext()
+
+    def query_pool(self, pool, sim_paths, spatial_threshold, temporal_threshold):
+        """query_pruned() across the pool: sim paths are pruned here, their legs and samples in the workers."""
+        kept = self.prune_sim_paths(sim_paths, spatial_threshold,
+                                    np.inf if temporal_threshold is None else temporal_threshold)
+        with self.instrumentation.stage('spatial_query' if temporal_threshold is None else 'space_time_query'):
+            primary_idx, sim_idx, sim_point_idx, stats = pool.find_conflict_pairs(
+                [sim_paths[i] for i in kept], spatial_threshold, temporal_threshold)
+        self._count_query(stats)
+        return primary_idx, kept[sim_idx], sim_point_idx
 
     def check_spatial_conflict(self, spatial_threshold):
         """Check deconflict between the primary path and all sim paths based on the threshold distance."""
-        spatial_conflict_results = []
-        
-        # Compare the primary path against each simulation path
-        for i, sim_path in enumerate(self.sim_paths):
-            df1 = self.primary_path.wp_data  # DataFrame of the primary path waypoints
-            df2 = sim_path.wp_data  # DataFrame of the current simulation path waypoints
-                
-            # Find points within the threshold distance
-            indices_df1, indices_df2 = self.find_points_within_threshold(df1, df2, spatial_threshold)
-                
-            if indices_df1:  # If there are any conflicts
-                spatial_conflict_results.append({
-                    'sim_path': i,
-                    'indices_df1': indices_df1,
-                    'indices_df2': indices_df2
-                })
-        
-        return spatial_conflict_results
-    
-    def check_temporal_spatial_conflict(self, temporal_threshold):
-        """Check for temporal conflicts."""
-
-        temporal_conflicts = []
-
-        for conflict in self.spatial_conflict_results:
-            indices_df1 = conflict['indices_df1']
-            indices_df2 = conflict['indices_df2']
-            sim_path_idx = conflict['sim_path']
-            
-            temporal_indices_df1 = []
-            temporal_indices_df2 = []
-
-            # Compare each conflicting pair for temporal conflict
-            for i, j in zip(indices_df1, indices_df2):
-                # Get the time for each conflicting point
-                time1 = self.primary_path.wp_data.loc[i, 'timestamp']
-                time2 = self.sim_paths[sim_path_idx].wp_data.loc[j, 'timestamp']
-                
-                # Temporal conflict check: Time difference between points
-                time_diff = abs(time1 - time2)
-                
-                # If time difference is below the temporal threshold, consider it a temporal conflict
-                if time_diff <= temporal_threshold:
-                    temporal_indices_df1.append(i)
-                    temporal_indices_df2.append(j)
-
-            # If any temporal conflicts were found, record them
-            if temporal_indices_df1:
-                temporal_conflicts.append({
-                    'sim_path': sim_path_idx,
-                    'indices_df1': temporal_indices_df1,
-                    'indices_df2': temporal_indices_df2
-                })
-
-        return temporal_conflicts
+        conflicts = []
+        with self.conflict_pool() as pool:
+            for first, sim_paths in self.sim_chunks():
+                if pool is not None:
+                    primary_idx, sim_idx, sim_point_idx = self.query_pool(pool, sim_paths, spatial_threshold, None)
+                else:
+                    # Grid hash over the sim samples that survive the bounding volume check
+                    primary_idx, sim_idx, sim_point_idx = self.query_pruned(sim_paths, spatial_threshold, None)
 
-    def get_conflict_summary(self):
-        summary_text = ""
-        if len(self.spatial_temporal_conflict_results) > 0:
-            self.conflict_bool = True
-            summary_text += "Conflict Detected\n"
-            
-            conflict_indices_primary = set()
-            for conflict in self.spatial_temporal_conflict_results:
-                summary_text += f"sim drone: {conflict['sim_path']}\n"
-
-                conflict_indices_primary.update(conflict['indices_df1'])
-
-                for conflict_idx in conflict_indices_primary:
-                    lat,long,alt,timestamp = self.primary_path.wp_data.iloc[conflict_idx] 
-                    summary_text += f"location:\nlatitude:{lat}\nlongitude:{long}\naltitude:{alt}\ntime:{timestamp}\n"
+                with self.instrumentation.stage('group_results'):
+                    found = self.pair_intervals(primary_idx, sim_idx, sim_point_idx, sim_paths)
+                found.sim_path += first
+                conflicts.append(found)
+
+        return intervals.concatenate(conflicts)
+
+    def prune_sim_paths(self, sim_paths, spatial_threshold, temporal_threshold):
+        """Indices of the sim paths whose bounding box may come within the thresholds of the primary's."""
+        with self.instrumentation.stage('prune'):
+            if not sim_paths:
+                return np.empty(0, dtype=np.int64)
+            primary = self.primary_path.bounds.union()
+            boxes = [sim_path.bounds.union() for sim_path in sim_paths]
+            kept = np.flatnonzero(bounds.may_conflict(
+                primary.lower, primary.upper, np.concatenate([box.lower for box in boxes]),
+                np.concatenate([box.upper for box in boxes]), spatial_threshold, temporal_threshold))
+        self.instrumentation.count('drones_pruned', len(sim_paths) - len(kept))
+        return kept
+
+    def prune_samples(self, sim_paths, spatial_threshold, temporal_threshold):
+        """Bounding volume pre-filter: (kept sim path indices, sample ids per kept path, primary sample ids).
+
+        Sim paths rejected by prune_sim_paths() are dropped. Of the rest, only samples on legs
+        whose box may conflict with some primary leg are kept, and likewise for the primary.
+        """
+        kept = self.prune_sim_paths(sim_paths, spatial_threshold, temporal_threshold)
+        primary = self.primary_path
+        with self.instrumentation.stage('prune'):
+            leg_counts = [len(sim_paths[i].bounds) for i in kept]
+            sim_lower = np.concatenate([sim_paths[i].bounds.lower for i in kept]) if len(kept) else np.empty((0, 4))
+            sim_upper = np.concatenate([sim_paths[i].bounds.upper for i in kept]) if len(kept) else np.empty((0, 4))
+            primary_legs, sim_legs = bounds.conflicting_legs(primary.bounds.lower, primary.bounds.upper, sim_lower,
+                                                             sim_upper, spatial_threshold, temporal_threshold,
+                                                             self.max_pairs_per_block)
+
+            sample_ids = [bounds.samples_on_legs(sim_paths[i].waypoints.timestamp, sim_paths[i].trajectory.timestamp, legs)
+                          for i, legs in zip(kept, np.split(sim_legs, np.cumsum(leg_counts)[:-1]))]
+            primary_ids = bounds.samples_on_legs(primary.waypoints.timestamp, primary.trajectory.timestamp, primary_legs)
+
+        self.instrumentation.count('sim_points_pruned', sum(len(sim_paths[i].trajectory) for i in kept)
+                                   - sum(len(ids) for ids in sample_ids))
+        self.instrumentation.count('primary_points_pruned', len(primary.trajectory) - len(primary_ids))
+        return kept, sample_ids, primary_ids
+
+    def query_pruned(self, sim_paths, spatial_threshold, temporal_threshold):
+        """(primary_idx, sim_idx, sim_point_idx) of all sample pairs within the thresholds.
+
+        Only samples kept by prune_samples() are indexed and queried. temporal_threshold=None
+        checks distance only.
+        """
+        kept, sample_ids, primary_ids = self.prune_samples(
+            sim_paths, spatial_threshold, np.inf if temporal_threshold is None else temporal_threshold)
+        primary = self.primary_path.trajectory[primary_ids]
+        coords = [sim_paths[i].trajectory.coordinates()[ids] for i, ids in zip(kept, sample_ids)]
+        times = [sim_paths[i].trajectory.timestamp[ids] for i, ids in zip(kept, sample_ids)]
+
+        if temporal_threshold is None:
+            with self.instrumentation.stage('index_build'):
+                self.sim_index = index = spatial_index.SpatialIndex.from_arrays(coords, times, spatial_threshold)
+            with self.instrumentation.stage('spatial_query'):
+                query_idx, point_ids = index.query_radius(primary.coordinates(), spatial_threshold,
+                                                          self.max_pairs_per_block)
         else:
-            self.conflict_bool = False
-            summary_text += "Path Clear"
+            # Time buckets no smaller than a second keep the number of neighbouring buckets small
+            with self.instrumentation.stage('index_build'):
+                self.space_time_index = index = spatial_index.SpatialIndex.from_arrays(
+                    coords, times, spatial_threshold, time_bucket=max(temporal_threshold, 1))
+            with self.instrumentation.stage('space_time_query'):
+                query_idx, point_ids = index.query_space_time(primary.coordinates(), primary.timestamp,
+                                                              spatial_threshold, temporal_threshold,
+                                                              self.max_pairs_per_block)
+        self._count_query(index.last_query_stats)
+
+        # Back from pruned positions to the original sample and path indices
+        sim_idx, _ = index.locate(point_ids)
+        all_ids = np.concatenate(sample_ids) if sample_ids else np.empty(0, dtype=np.int64)
+        return primary_ids[query_idx], kept[sim_idx], all_ids[point_ids]
+
+    def check_temporal_spatial_conflict(self, temporal_threshold):
+        """Check for spatial conflicts that are also within temporal_threshold seconds.
+
+        Uses a single space-time grid query: candidate pairs are pruned by time before any
+        distance is computed, instead of filtering the full spatial result afterwards.
+        """
+        conflicts = []
+        with self.conflict_pool() as pool:
+            for first, sim_paths in self.sim_chunks():
+                if pool is not None:
+                    primary_idx, sim_idx, sim_point_idx = self.query_pool(
+                        pool, sim_paths, self.spatial_threshold, temporal_threshold)
+                else:
+                    primary_idx, sim_idx, sim_point_idx = self.query_pruned(
+                        sim_paths, self.spatial_threshold, temporal_threshold)
+
+                with self.instrumentation.stage('group_results'):
+                    found = self.pair_intervals(primary_idx, sim_idx, sim_point_idx, sim_paths)
+                found.sim_path += first
+                conflicts.append(found)
 
-        return summary_text
\ No newline at end of file
+        return intervals.concatenate(conflicts)
+
+    def check_segment_conflict(self, spatial_threshold, temporal_threshold):
+        """Check for spatial-temporal conflicts using the exact closest approach of path segments.
+
+        Conflicting segment pairs on consecutive primary legs are merged into one conflict
+        interval spanning their times of closest approach. The raw closest approach data is
+        kept in self.closest_approach_results.
+        """
+        conflicts = []
+        found_chunks = []
+        for first, sim_paths in self.sim_chunks():
+            kept = self.prune_sim_paths(sim_paths, spatial_threshold, temporal_threshold)
+            with self.instrumentation.stage('closest_approach'):
+                found = closest_approach.closest_approaches(
+                    self.primary_path, [sim_paths[i] for i in kept], spatial_threshold, temporal_threshold,
+                    self.max_pairs_per_block, self._count_query)
+            found['sim_path'] = kept[found['sim_path']]
+            self.instrumentation.count('matches', len(found['sim_path']))
+
+            found['sim_path'] = found['sim_path'] + first
+            conflicts.append(self.segment_intervals(found))
+            found_chunks.append(found)
+
+        self.closest_approach_results = {key: np.concatenate([found[key] for found in found_chunks])
+                                         for key in found_chunks[0]} if found_chunks else {}
+        return intervals.concatenate(conflicts)
+
+    def segment_intervals(self, found):
+        """Merges closest approach results into conflict intervals, consecutive primary legs together."""
+        return intervals.merge(found['sim_path'], found['primary_time'], found['sim_time'], found['separation'],
+                               found['primary_location'], found['sim_location'], self.merge_gap(),
+                               step=found['primary_segment'], span=(found['primary_start'], found['primary_end']))
+
+    def pair_intervals(self, primary_idx, sim_idx, sim_point_idx, sim_paths):
+        """Merges matched (primary sample, sim path, sim sample) triples into conflict intervals.
+
+        sim_idx indexes into sim_paths; see intervals.from_pairs().
+        """
+        return intervals.from_pairs(self.primary_path.trajectory, primary_idx, sim_idx, sim_point_idx, sim_paths,
+                                    self.merge_gap())
+
+    def get_conflict_summary(self):
+        """Text summary with one entry per conflict interval."""
+        self.conflict_bool = len(self.spatial_temporal_conflict_results) > 0
+        names = [sim_path.name for sim_path in self.sim_paths] if self.sim_paths is not None else None
+        return intervals.summary(self.spatial_temporal_conflict_results, names)
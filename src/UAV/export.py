@@ -0,0 +1,194 @@
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from mpl_toolkits.mplot3d.art3d import Line3DCollection
+import decimate
+import parallel
+import path
+import timeline
+
+# Offline rendering of the flight replay: figures are drawn straight onto Agg canvases
+# (no pyplot, no GUI backend), so this runs on servers without a display.
+
+# File names of exported frames, numbered from 0
+FRAME_NAME = "frame_{:06d}.png"
+
+# Scene as seen by a worker process: figure, artists and the fleet timeline (views into shared memory)
+_scene = {}
+
+
+def _attach_scene(name, num_samples, lengths, primary, static_lines, limits, figsize, dpi):
+    """Worker initializer: maps the shared sim samples and draws the static part of the scene once."""
+    shm, coords, times = parallel.attach_samples(name, num_samples)
+    _scene['shm'] = shm  # Keep the mapping alive for the worker's lifetime
+    _scene['fleet'] = timeline.Timeline.from_arrays(coords, times, lengths)
+    _scene['primary'] = primary
+
+    fig = Figure(figsize=figsize, dpi=dpi)
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot(111, projection='3d')
+    static_primary, sim_lines = static_lines
+    ax.plot(static_primary[:, 0], static_primary[:, 1], static_primary[:, 2], label="primary drone", color='green')
+    if sim_lines:
+        ax.add_collection3d(Line3DCollection(sim_lines, label="sim drones", linewidths=1,
+                                             colors=[f'C{i}' for i in range(10)]))
+    ax.auto_scale_xyz(*zip(*limits))
+    ax.set_xlabel('Latitude')
+    ax.set_ylabel('Longitude')
+    ax.set_zlabel('Altitude')
+
+    _scene['fig'] = fig
+    _scene['ax'] = ax
+    _scene['primary_marker'], = ax.plot([], [], [], 'ro', label='Primary Drone')
+    _scene['sim_scatter'] = ax.scatter([], [], [], color='green', label='Sim Drones')
+    ax.legend()
+
+
+def _render_frames(first_frame, times, start_time, out_dir):
+    """Worker task: renders the frames for the given times, numbered from first_frame. Returns the count."""
+    primary_coords, primary_times = _scene['primary']
+    for k, current_time in enumerate(times):
+        idx = np.searchsorted(primary_times, current_time, side='right') - 1
+        marker = _scene['primary_marker']
+        if idx >= 0:
+            marker.set_data([primary_coords[idx, 0]], [primary_coords[idx, 1]])
+            marker.set_3d_properties([primary_coords[idx, 2]])
+        marker.set_visible(bool(idx >= 0))
+
+        _, positions = _scene['fleet'].positions(current_time)
+        _scene['sim_scatter']._offsets3d = (positions[:, 0], positions[:, 1], positions[:, 2])
+        _scene['ax'].set_title(f'Flight Visualization (4D) - t = {current_time - start_time:.1f} s')
+        _scene['fig'].savefig(os.path.join(out_dir, FRAME_NAME.format(first_frame + k)))
+    return len(times)
+
+
+def frame_times(primary_path, time_step=1.0):
+    """Mission times of the frames: every time_step seconds from the primary's start to its end time."""
+    if time_step <= 0:
+        raise ValueError("time_step must be positive")
+    duration = max(primary_path.end_time - primary_path.start_time, 0)
+    return primary_path.start_time + time_step * np.arange(int(np.floor(duration / time_step)) + 1)
+
+
+def render_frames(paths, out_dir, time_step=1.0, workers=None, figsize=(10, 8), dpi=100,
+                  resolution=decimate.DEFAULT_RESOLUTION):
+    """Renders the flight replay of visualization.visualize_flight() as PNG frames in out_dir.
+
+    Frames are split into contiguous chunks rendered by a process pool of workers processes
+    (all CPUs by default); every worker draws the static paths once and then only moves the
+    drone markers. The sim samples are placed in one shared memory buffer that every worker
+    maps directly. Returns the number of frames written.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    workers = workers or os.cpu_count() or 1
+    primary = paths.primary_path.trajectory
+    sim_trajectories = [sim_path.trajectory for sim_path in paths.sim_paths]
+    times = frame_times(paths.primary_path, time_step)
+
+    span = decimate.scene_span([primary.coordinates()] + [t.coordinates() for t in sim_trajectories])
+    static_lines = (decimate.decimate(primary, span, resolution).coordinates(),
+                    [decimate.decimate(t, span, resolution).coordinates() for t in sim_trajectories])
+    all_coords = np.concatenate([primary.coordinates()] + [t.coordinates() for t in sim_trajectories])
+    limits = (all_coords.min(axis=0), all_coords.max(axis=0))
+    lengths = np.array([len(t) for t in sim_trajectories], dtype=np.int64)
+    # A few chunks per worker keeps the pool busy while frames vary in cost
+    chunks = [chunk for chunk in np.array_split(np.arange(len(times)), workers * 4) if len(chunk)]
+
+    shm = parallel.share_samples(
+        np.concatenate([t.coordinates() for t in sim_trajectories]) if sim_trajectories else np.empty((0, 3)),
+        np.concatenate([t.timestamp for t in sim_trajectories]) if sim_trajectories else np.empty(0))
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_attach_scene,
+                                 initargs=(shm.name, int(lengths.sum()), lengths,
+                                           (primary.coordinates(), primary.timestamp),
+                                           static_lines, limits, figsize, dpi)) as pool:
+            futures = [pool.submit(_render_frames, int(chunk[0]), times[chunk], paths.primary_path.start_time, out_dir)
+                       for chunk in chunks]
+            written = sum(future.result() for future in futures)
+    finally:
+        shm.close()
+        shm.unlink()
+    return written
+
+
+def _ffmpeg():
+    ffmpeg = shutil.which('ffmpeg')
+    if ffmpeg is None:
+        raise RuntimeError("Exporting video needs ffmpeg on the PATH; export a .gif or a frame folder instead")
+    return ffmpeg
+
+
+def assemble(frame_dir, output, fps=10):
+    """Joins the frames in frame_dir into one animation file.
+
+    GIFs are written with Pillow (installed with matplotlib); other formats (e.g. .mp4) need
+    the ffmpeg executable on the PATH.
+    """
+    pattern = os.path.join(frame_dir, FRAME_NAME.replace('{:06d}', '%06d'))
+    if output.lower().endswith('.gif'):
+        from PIL import Image
+        names = sorted(name for name in os.listdir(frame_dir) if name.startswith('frame_'))
+        frames = [Image.open(os.path.join(frame_dir, name)) for name in names]
+        frames[0].save(output, save_all=True, append_images=frames[1:], duration=int(1000 / fps), loop=0)
+        return
+
+    # Even frame dimensions are required by the yuv420p pixel format most players expect
+    subprocess.run([_ffmpeg(), '-y', '-loglevel', 'error', '-framerate', str(fps), '-i', pattern,
+                    '-vf', 'pad=ceil(iw/2)*2:ceil(ih/2)*2', '-pix_fmt', 'yuv420p', output], check=True)
+
+
+def export_flight(paths, output, time_step=1.0, fps=10, workers=None, figsize=(10, 8), dpi=100):
+    """Exports the flight replay without a display. Returns the number of frames.
+
+    output is a folder (PNG frames, see FRAME_NAME) or an animation file: .gif, or any
+    video format ffmpeg can write. Each frame advances the mission clock by time_step
+    seconds; videos play at fps frames per second.
+    """
+    if not os.path.splitext(output)[1]:
+        return render_frames(paths, output, time_step, workers, figsize, dpi)
+    if not output.lower().endswith('.gif'):
+        _ffmpeg()  # Fail before rendering rather than after
+
+    frame_dir = tempfile.mkdtemp(prefix='uav_frames_')
+    try:
+        count = render_frames(paths, frame_dir, time_step, workers, figsize, dpi)
+        if count:
+            assemble(frame_dir, output, fps)
+    finally:
+        shutil.rmtree(frame_dir, ignore_errors=True)
+    return count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Render the 4D flight replay of a primary mission and the sim fleet to image frames or a "
+                    "video file, without a display.")
+    parser.add_argument('output', help="folder for PNG frames, or an animation file (.gif, .mp4 with ffmpeg)")
+    parser.add_argument('--primary', nargs=2, required=True, metavar=('CSV', 'JSON'),
+                        help="primary mission waypoints and time window")
+    parser.add_argument('--sim-data', default='data/', help="folder with sim_drone_*.csv/.json files")
+    parser.add_argument('--fleet-file', help="read the sim fleet from this fleet file instead (see fleet.py)")
+    parser.add_argument('--cache-dir', help="reuse interpolated sim trajectories cached in this folder")
+    parser.add_argument('--sample-interval', type=float, default=1.0)
+    parser.add_argument('--time-step', type=float, default=1.0, help="mission seconds per frame")
+    parser.add_argument('--fps', type=float, default=10, help="frames per second of the animation file")
+    parser.add_argument('--workers', type=int, help="rendering processes (default: all CPUs)")
+    parser.add_argument('--dpi', type=int, default=100)
+    args = parser.parse_args(argv)
+
+    paths = path.Paths(args.sim_data, args.primary[0], args.primary[1], args.sample_interval,
+                       cache_dir=args.cache_dir, fleet_file=args.fleet_file)
+    count = export_flight(paths, args.output, args.time_step, args.fps, args.workers, dpi=args.dpi)
+    print(f"{count} frames written to {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
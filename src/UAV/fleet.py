@@ -0,0 +1,122 @@
+import argparse
+import json
+import os
+import struct
+import numpy as np
+import pandas as pd
+
+# File layout: MAGIC, little-endian uint64 header length, JSON header, then aligned column arrays
+MAGIC = b"UAVFLEET"
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+
+# Columns stored for every fleet; waypoint columns hold all drones back to back
+WAYPOINT_COLUMNS = ('lat', 'long', 'alt')
+COLUMN_DTYPES = {'lat': '<f8', 'long': '<f8', 'alt': '<f8', 'offsets': '<i8', 't_start': '<f8', 't_end': '<f8'}
+
+
+def _align(position):
+    return (position + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def write_fleet(file_path, names, waypoints, start_times, end_times):
+    """Writes a fleet file.
+
+    names: drone identifiers; waypoints: one (N_i, 3) lat/long/alt array per drone;
+    start_times/end_times: T_start/T_end per drone.
+    """
+    lengths = [len(w) for w in waypoints]
+    columns = {
+        'offsets': np.concatenate(([0], np.cumsum(lengths))).astype('<i8'),
+        't_start': np.asarray(start_times, dtype='<f8'),
+        't_end': np.asarray(end_times, dtype='<f8'),
+    }
+    stacked = np.concatenate(waypoints) if waypoints else np.empty((0, 3))
+    for k, column in enumerate(WAYPOINT_COLUMNS):
+        columns[column] = np.ascontiguousarray(stacked[:, k], dtype=COLUMN_DTYPES[column])
+
+    # The header stores absolute byte offsets, which depend on the header length itself;
+    # reserve a generous fixed size for the offset digits so one pass is enough.
+    layout = {}
+    header = {'version': FORMAT_VERSION, 'num_drones': len(names), 'num_points': int(sum(lengths)),
+              'names': list(names), 'columns': layout}
+    for column in columns:
+        layout[column] = {'dtype': COLUMN_DTYPES[column], 'length': len(columns[column]), 'offset': 10**15}
+    position = _align(len(MAGIC) + 8 + len(json.dumps(header).encode()))
+    for column, values in columns.items():
+        layout[column]['offset'] = position
+        position = _align(position + values.nbytes)
+    header_bytes = json.dumps(header).encode()
+
+    with open(file_path, 'wb') as file:
+        file.write(MAGIC)
+        file.write(struct.pack('<Q', len(header_bytes)))
+        file.write(header_bytes)
+        for column, values in columns.items():
+            file.seek(layout[column]['offset'])
+            file.write(values.tobytes())
+        file.truncate(position)
+
+
+class FleetFile:
+    def __init__(self, file_path):
+        """Opens a fleet file with a single read-only memory map.
+
+        Columns are exposed as zero-copy NumPy views into the map, so only the pages that
+        are actually touched are read from disk.
+        """
+        self.file_path = file_path
+        with open(file_path, 'rb') as file:
+            if file.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"Not a fleet file: {file_path}")
+            (header_length,) = struct.unpack('<Q', file.read(8))
+            self.header = json.loads(file.read(header_length))
+        if self.header['version'] != FORMAT_VERSION:
+            raise ValueError(f"Unsupported fleet file version: {self.header['version']}")
+
+        self._map = np.memmap(file_path, dtype=np.uint8, mode='r')
+        self.names = self.header['names']
+        for column, spec in self.header['columns'].items():
+            dtype = np.dtype(spec['dtype'])
+            start = spec['offset']
+            view = self._map[start:start + spec['length'] * dtype.itemsize].view(dtype)
+            setattr(self, column, view)
+
+    def __len__(self):
+        return self.header['num_drones']
+
+    def waypoints(self, i):
+        """(N_i, 3) lat/long/alt waypoints of drone i."""
+        start, end = self.offsets[i], self.offsets[i + 1]
+        return np.column_stack((self.lat[start:end], self.long[start:end], self.alt[start:end]))
+
+    def time_window(self, i):
+        """(T_start, T_end) of drone i."""
+        return float(self.t_start[i]), float(self.t_end[i])
+
+
+def import_csv_json(folder_path, file_path):
+    """Converts a folder of sim_drone_*.csv/.json pairs into a single fleet file."""
+    # Imported here so that reading fleet files does not depend on the path module
+    import path
+
+    names, waypoints, start_times, end_times = [], [], [], []
+    for csv_file, json_file in path.Paths.find_sim_files_in(folder_path):
+        with open(json_file, 'r') as file:
+            data = json.load(file)
+        names.append(os.path.splitext(os.path.basename(csv_file))[0])
+        waypoints.append(pd.read_csv(csv_file)[list(WAYPOINT_COLUMNS)].to_numpy(dtype=float))
+        start_times.append(data['T_start'])
+        end_times.append(data['T_end'])
+
+    write_fleet(file_path, names, waypoints, start_times, end_times)
+    return len(names)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Convert a folder of sim_drone_*.csv/.json files into one fleet file.")
+    parser.add_argument('folder', help="folder containing sim_drone_*.csv and sim_drone_*.json")
+    parser.add_argument('output', help="fleet file to write")
+    args = parser.parse_args()
+    count = import_csv_json(args.folder, args.output)
+    print(f"Wrote {count} drones to {args.output}")
@@ -0,0 +1,83 @@
+import contextlib
+import json
+import time
+import tracemalloc
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+
+class Instrumentation:
+    def __init__(self, trace_memory=False):
+        """Collects wall time per pipeline stage and named counters.
+
+        With trace_memory=True, tracemalloc also records the peak traced allocation of every
+        stage (this slows allocation-heavy code down, so it is off by default).
+        """
+        self.trace_memory = trace_memory
+        self.stages = {}
+        self.counters = {}
+        self._stack = []  # Peak allocation seen so far by each open stage
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        """Times the enclosed block and adds it to stage name (stages can nest and repeat)."""
+        tracing = self.trace_memory
+        if tracing:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            if self._stack:
+                self._stack[-1] = max(self._stack[-1], tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+            self._stack.append(0)
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            record = self.stages.setdefault(name, {'seconds': 0.0, 'calls': 0})
+            record['seconds'] += elapsed
+            record['calls'] += 1
+
+            if tracing:
+                peak = max(self._stack.pop(), tracemalloc.get_traced_memory()[1])
+                record['peak_memory_bytes'] = max(record.get('peak_memory_bytes', 0), peak)
+                if self._stack:
+                    self._stack[-1] = max(self._stack[-1], peak)
+
+    def count(self, name, value=1):
+        self.counters[name] = self.counters.get(name, 0) + int(value)
+
+    def report(self):
+        """Structured report: stages (seconds, calls, optional peak_memory_bytes) and counters."""
+        report = {'stages': {name: dict(record) for name, record in self.stages.items()},
+                  'counters': dict(self.counters)}
+        if resource is not None:
+            # ru_maxrss is in kilobytes on Linux
+            report['max_rss_bytes'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+        return report
+
+    def save(self, file_path):
+        """Writes report() as JSON."""
+        with open(file_path, 'w') as file:
+            json.dump(self.report(), file, indent=2)
+
+
+class NullInstrumentation:
+    """Drop-in replacement that records nothing, used when instrumentation is disabled."""
+    _stage = contextlib.nullcontext()
+
+    def stage(self, name):
+        return self._stage
+
+    def count(self, name, value=1):
+        pass
+
+    def report(self):
+        return {'stages': {}, 'counters': {}}
+
+
+NULL_INSTRUMENTATION = NullInstrumentation()
@@ -0,0 +1,133 @@
+import numpy as np
+import distance
+
+# One row per conflict interval between the primary path and one sim path
+INTERVAL_DTYPE = np.dtype([
+    ('sim_path', np.int64),          # index of the sim path in the fleet
+    ('start_time', np.float64),      # primary time span of the interval
+    ('end_time', np.float64),
+    ('pairs', np.int64),             # conflicting sample (or segment) pairs merged into the interval
+    ('min_separation', np.float64),  # meters, at the closest approach below
+    ('primary_time', np.float64),
+    ('sim_time', np.float64),
+    ('primary_lat', np.float64),
+    ('primary_long', np.float64),
+    ('primary_alt', np.float64),
+    ('sim_lat', np.float64),
+    ('sim_long', np.float64),
+    ('sim_alt', np.float64),
+])
+
+
+def empty():
+    return np.recarray(0, dtype=INTERVAL_DTYPE)
+
+
+def concatenate(parts):
+    """Joins interval record arrays (e.g. one per fleet chunk)."""
+    parts = [part for part in parts if len(part)]
+    return np.concatenate(parts).view(np.recarray) if parts else empty()
+
+
+def merge(sim_path, primary_time, sim_time, separation, primary_location, sim_location, max_gap, step=None,
+          span=None):
+    """Merges conflicting pairs into conflict intervals.
+
+    Each pair is given by its sim path, the primary and sim times, the separation and the
+    (N, 3) lat/long/alt locations of both drones. Pairs with the same sim path whose primary
+    times are at most max_gap seconds apart form one interval, which keeps the span, the
+    number of pairs and the pair of closest approach. If step (e.g. the primary segment of
+    each pair) is given, pairs are split where step jumps by more than one instead. span, a
+    (start, end) pair of arrays, gives each pair's own primary time span (a segment pair is
+    in conflict for a while, a sample pair only at its primary time).
+    Returns a record array of INTERVAL_DTYPE sorted by sim path and start time.
+    """
+    if len(sim_path) == 0:
+        return empty()
+    order = np.lexsort((separation, primary_time, sim_path))
+    sim_path, primary_time, sim_time = sim_path[order], primary_time[order], sim_time[order]
+    separation = separation[order]
+    gap = np.diff(primary_time) > max_gap if step is None else np.diff(step[order]) > 1
+    primary_location, sim_location = primary_location[order], sim_location[order]
+    span_start, span_end = (primary_time, primary_time) if span is None else (span[0][order], span[1][order])
+
+    new = np.ones(len(sim_path), dtype=bool)
+    new[1:] = (sim_path[1:] != sim_path[:-1]) | gap
+    starts = np.flatnonzero(new)
+    ends = np.append(starts[1:], len(sim_path))
+    # Within each interval (contiguous after sorting), the pair with the smallest separation
+    group = np.cumsum(new) - 1
+    closest = np.lexsort((separation, group))[starts]
+
+    result = np.recarray(len(starts), dtype=INTERVAL_DTYPE)
+    result.sim_path = sim_path[starts]
+    result.start_time = np.minimum.reduceat(span_start, starts)
+    result.end_time = np.maximum.reduceat(span_end, starts)
+    result.pairs = ends - starts
+    result.min_separation = separation[closest]
+    result.primary_time = primary_time[closest]
+    result.sim_time = sim_time[closest]
+    result.primary_lat, result.primary_long, result.primary_alt = primary_location[closest].T
+    result.sim_lat, result.sim_long, result.sim_alt = sim_location[closest].T
+    return result
+
+
+def from_pairs(primary, primary_idx, sim_idx, sim_point_idx, sim_paths, max_gap):
+    """Merges matched (primary sample, sim path, sim sample) triples into conflict intervals.
+
+    primary is the primary Trajectory and sim_idx indexes into sim_paths; only the sim paths
+    in conflict are read.
+    """
+    sim_location = np.empty((len(sim_idx), 3))
+    sim_time = np.empty(len(sim_idx))
+    order = np.argsort(sim_idx, kind='stable')
+    for group in np.split(order, np.flatnonzero(np.diff(sim_idx[order])) + 1):
+        if len(group) == 0:
+            continue
+        samples = sim_paths[sim_idx[group[0]]].trajectory[sim_point_idx[group]]
+        sim_location[group] = samples.coordinates()
+        sim_time[group] = samples.timestamp
+
+    primary_location = primary[primary_idx].coordinates()
+    separation = distance.distance_3d(primary_location[:, 0], primary_location[:, 1], primary_location[:, 2],
+                                      sim_location[:, 0], sim_location[:, 1], sim_location[:, 2])
+    return merge(sim_idx, primary.timestamp[primary_idx], sim_time, separation, primary_location, sim_location,
+                 max_gap)
+
+
+def conflicting_drones(intervals):
+    """Sorted indices of the sim paths with at least one conflict interval."""
+    return np.unique(intervals.sim_path)
+
+
+def summary(intervals, names=None):
+    """Text summary with one entry per conflict interval.
+
+    names optionally maps sim path indices to drone names.
+    """
+    if len(intervals) == 0:
+        return "Path Clear"
+    lines = ["Conflict Detected"]
+    for interval in intervals:
+        drone = f"{interval.sim_path} ({names[interval.sim_path]})" if names is not None else interval.sim_path
+        lines.append(f"sim drone: {drone}")
+        lines.append(f"time: {interval.start_time} - {interval.end_time}")
+        lines.append(f"min separation: {interval.min_separation:.2f} m at time {interval.primary_time}")
+        lines.append(f"location:\nlatitude:{interval.primary_lat}\nlongitude:{interval.primary_long}\n"
+                     f"altitude:{interval.primary_alt}")
+    return "\n".join(lines) + "\n"
+
+
+def to_records(intervals, names=None):
+    """JSON-ready list of dicts, one per interval."""
+    records = []
+    for interval in intervals:
+        record = {field: interval[field].item() for field in ('sim_path', 'start_time', 'end_time', 'pairs',
+                                                              'min_separation', 'primary_time', 'sim_time')}
+        if names is not None:
+            record['sim_name'] = names[interval.sim_path]
+        record['primary_location'] = [interval.primary_lat.item(), interval.primary_long.item(),
+                                      interval.primary_alt.item()]
+        record['sim_location'] = [interval.sim_lat.item(), interval.sim_long.item(), interval.sim_alt.item()]
+        records.append(record)
+    return records
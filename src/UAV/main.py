@@ -1,8 +1,21 @@
-import deconflict, path, visualization
+import deconflict, path, visualization, cache, instrumentation
 import tkinter as tk
 from tkinter import filedialog, messagebox, ttk
 import pandas as pd
 import json
+import os
+import queue
+import threading
+
+# Sim fleet folder; interpolated sim trajectories are cached inside it between runs
+SIM_DATA_PATH = 'data/'
+CACHE_DIR = os.path.join(SIM_DATA_PATH, '.cache')
+
+# Separation profile horizons (m, s): threshold changes within them need no recompute
+PROFILE_HORIZON = (50, 60)
+
+# Sim drones checked between progress updates (and cancel checks)
+ANALYSIS_CHUNK_SIZE = 100
 
 # Color scheme - High-tech dark theme
 COLORS = {
@@ -34,10 +47,16 @@ def load_sim_json():
         label_sim_json.config(text=f"✓ {filename}", fg=COLORS['success'])
         btn_sim_json.config(bg=COLORS['bg_light'])
 
+def analysis_key():
+    """Changes whenever the primary files or any sim fleet file on disk change."""
+    sim_files = [file for pair in path.Paths.find_sim_files_in(SIM_DATA_PATH) for file in pair]
+    return cache.fleet_key([csv_file_path, json_file_path] + sim_files, 0)
+
 def check_conflict():
-    global paths_obj
-    global deconflict_obj
-    
+    """Starts the analysis on a background thread; poll_analysis() picks up its progress and result."""
+    global analysis_thread
+    global cancel_event
+
     try:
         temporal_threshold = float(entry_temporal.get())
         spatial_threshold = float(entry_spatial.get())
@@ -51,26 +70,113 @@ def check_conflict():
     
     # Update status to analyzing
     status_label.config(text="⚡ ANALYZING...", fg=COLORS['accent_cyan'])
-    root.update()
-    
-    paths_obj = path.Paths(primary_path_csv=csv_file_path, primary_path_json=json_file_path)
-    deconflict_obj = deconflict.Deconflict(paths_obj, spatial_threshold, temporal_threshold)
+    btn_check.config(state=tk.DISABLED)
+    btn_cancel.config(state=tk.NORMAL, bg=COLORS['warning'])
+    # Results are replaced by the run, so nothing may read them meanwhile
+    for btn in [btn_vis_fp, btn_vis_stc, btn_vis_animation, btn_vis_sc, btn_metrics]:
+        btn.config(state=tk.DISABLED, bg=COLORS['bg_light'], fg=COLORS['text_gray'])
     
-    # Apply temporal and spatial thresholds to the conflict check logic
-    conflict_detected = deconflict_obj.conflict_bool
-    
-    if conflict_detected:
+    cancel_event = threading.Event()
+    analysis_thread = threading.Thread(
+        target=run_analysis, args=(spatial_threshold, temporal_threshold, deconflict_obj, analysis_key_last,
+                                   cancel_event), daemon=True)
+    analysis_thread.start()
+    root.after(100, poll_analysis)
+
+def run_analysis(spatial_threshold, temporal_threshold, last_result, last_key, cancel_event):
+    """Worker thread: loads and checks the paths, reporting through analysis_messages (no Tk calls here)."""
+    try:
+        # Same inputs as the last run: answer the new thresholds from the cached separation profile
+        # (the key reads the files on disk, so missing files are reported like any other failure)
+        key = analysis_key()
+        if (last_result is not None and key == last_key
+                and last_result.profile.covers(spatial_threshold, temporal_threshold)):
+            result = last_result
+            paths, run_metrics = paths_obj, metrics
+            total = paths.num_sim_paths()
+            result.progress, result.cancel_event = progress_reporter(total), cancel_event
+            result.set_thresholds(spatial_threshold, temporal_threshold)
+        else:
+            # Fresh metrics per full run; threshold-only updates add to the run they reuse
+            run_metrics = instrumentation.Instrumentation()
+            analysis_messages.put(('status', "⚡ LOADING FLEET..."))
+            paths = path.Paths(SIM_DATA_PATH, csv_file_path, json_file_path, cache_dir=CACHE_DIR,
+                               instrumentation=run_metrics)
+            total = paths.num_sim_paths()
+            horizon = (max(PROFILE_HORIZON[0], 2 * spatial_threshold), max(PROFILE_HORIZON[1], 2 * temporal_threshold))
+            result = deconflict.Deconflict(paths, spatial_threshold, temporal_threshold, profile_horizon=horizon,
+                                           chunk_size=ANALYSIS_CHUNK_SIZE, instrumentation=run_metrics,
+                                           verbose=False, progress=progress_reporter(total), cancel_event=cancel_event)
+        # Spatial-only conflicts (for plotting) are computed here too, so the UI thread never runs a
+        # detection; after a cancel this stops at once and keeps whatever was found
+        analysis_messages.put(('status', "⚡ SPATIAL CONFLICTS..."))
+        result.spatial_conflict_results
+        result.progress = result.cancel_event = None
+        analysis_messages.put(('done', paths, result, run_metrics, key, result.get_conflict_summary()))
+    except Exception as error:
+        analysis_messages.put(('error', str(error)))
+
+def progress_reporter(total):
+    """Progress callback for Deconflict that forwards (drones done, distance evaluations) to the UI."""
+    def progress(done, evaluations):
+        analysis_messages.put(('progress', done, total, evaluations))
+    return progress
+
+def poll_analysis():
+    """Applies messages from the worker thread to the UI; reschedules itself until the run ends."""
+    global paths_obj
+    global deconflict_obj
+    global analysis_key_last
+    global metrics
+
+    while True:
+        try:
+            message = analysis_messages.get_nowait()
+        except queue.Empty:
+            root.after(100, poll_analysis)
+            return
+
+        if message[0] == 'status':
+            status_label.config(text=message[1], fg=COLORS['accent_cyan'])
+        elif message[0] == 'progress':
+            done, total, evaluations = message[1:]
+            status_label.config(text=f"⚡ ANALYZING... {done}/{total} drones, {evaluations:,} distance checks",
+                                fg=COLORS['accent_cyan'])
+        else:
+            break
+
+    btn_check.config(state=tk.NORMAL)
+    btn_cancel.config(state=tk.DISABLED, bg=COLORS['bg_light'])
+    if message[0] == 'error':
+        status_label.config(text="● ANALYSIS FAILED", fg=COLORS['warning'])
+        messagebox.showerror("Error", message[1])
+        return
+
+    paths_obj, deconflict_obj, metrics, key, summary = message[1:]
+    # A cancelled run only covers part of the fleet, so its profile must not be reused
+    analysis_key_last = None if deconflict_obj.cancelled else key
+
+    if deconflict_obj.cancelled:
+        status_label.config(text="■ CANCELLED - PARTIAL RESULTS", fg=COLORS['warning'])
+    elif deconflict_obj.conflict_bool:
         status_label.config(text="⚠ CONFLICT DETECTED", fg=COLORS['warning'])
     else:
         status_label.config(text="✓ PATH CLEAR", fg=COLORS['success'])
     
     summary_text.delete("1.0", tk.END)
-    summary_text.insert(tk.END, deconflict_obj.get_conflict_summary())
+    summary_text.insert(tk.END, summary)
     
     # Enable visualization buttons with visual feedback
-    for btn in [btn_vis_fp, btn_vis_stc, btn_vis_animation, btn_vis_sc]:
+    for btn in [btn_vis_fp, btn_vis_stc, btn_vis_animation, btn_vis_sc, btn_metrics]:
         btn.config(state=tk.NORMAL, bg=COLORS['accent_blue'], fg=COLORS['text_white'])
 
+def cancel_analysis():
+    """Asks the worker to stop at the next chunk; the results found so far are kept."""
+    if cancel_event is None:
+        return
+    cancel_event.set()
+    status_label.config(text="■ CANCELLING...", fg=COLORS['warning'])
+
 def visualize_fp():
     visualization.visualize_paths(paths_obj)
 
@@ -83,9 +189,22 @@ def visualize_animation():
 def visualize_sc():
     visualization.visualize_conflicts(paths_obj, deconflict_obj.spatial_conflict_results)
 
+def export_metrics():
+    """Saves the stage timings and counters of the last analysis as JSON."""
+    file_path = filedialog.asksaveasfilename(defaultextension=".json", filetypes=[("JSON files", "*.json")])
+    if file_path:
+        metrics.save(file_path)
+
 # Initialize global variables
 csv_file_path = None
 json_file_path = None
+deconflict_obj = None
+analysis_key_last = None
+metrics = None
+paths_obj = None
+analysis_thread = None
+cancel_event = None
+analysis_messages = queue.Queue()  # Worker thread -> UI
 
 # Tkinter UI setup
 root = tk.Tk()
@@ -305,7 +424,25 @@ btn_check = tk.Button(
     pady=12,
     cursor="hand2"
 )
-btn_check.pack()
+btn_check.pack(side=tk.LEFT, padx=5)
+
+btn_cancel = tk.Button(
+    section3_frame,
+    text="■ CANCEL",
+    command=cancel_analysis,
+    state=tk.DISABLED,
+    font=("Consolas", 12, "bold"),
+    bg=COLORS['bg_light'],
+    fg=COLORS['text_white'],
+    activebackground=COLORS['accent_blue'],
+    activeforeground=COLORS['text_white'],
+    relief=tk.FLAT,
+    bd=0,
+    padx=30,
+    pady=12,
+    cursor="hand2"
+)
+btn_cancel.pack(side=tk.LEFT, padx=5)
 
 # ===== SECTION 4: STATUS =====
 status_frame = tk.Frame(root, bg=COLORS['bg_medium'], relief=tk.RAISED, bd=2)
@@ -415,6 +552,25 @@ btn_vis_sc = tk.Button(
 )
 btn_vis_sc.grid(row=1, column=1, padx=5, pady=5)
 
+btn_metrics = tk.Button(
+    vis_buttons_frame,
+    text="⏱ EXPORT METRICS",
+    command=export_metrics,
+    state=tk.DISABLED,
+    font=("Consolas", 9, "bold"),
+    bg=COLORS['bg_light'],
+    fg=COLORS['text_gray'],
+    activebackground=COLORS['accent_blue'],
+    activeforeground=COLORS['text_white'],
+    relief=tk.FLAT,
+    bd=0,
+    padx=15,
+    pady=8,
+    cursor="hand2",
+    width=25
+)
+btn_metrics.grid(row=2, column=0, columnspan=2, padx=5, pady=5)
+
 # ===== SECTION 6: CONFLICT SUMMARY =====
 section6_frame = tk.Frame(root, bg=COLORS['bg_medium'], relief=tk.RAISED, bd=2)
 section6_frame.grid(row=7, column=0, columnspan=3, sticky="ew", padx=20, pady=10)
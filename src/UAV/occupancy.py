@@ -0,0 +1,125 @@
+import numpy as np
+import deconflict
+import distance
+import intervals
+
+# Half-width of the latitude band (degrees) a grid covers around its origin
+DEFAULT_LATITUDE_BAND = 1.0
+
+# Offsets to a cell and its 80 neighbours in (x, y, z, time bucket)
+_NEIGHBOURS = np.stack(np.meshgrid(*[np.arange(-1, 2)] * 4, indexing='ij'), axis=-1).reshape(-1, 4)
+
+
+class OccupancyGrid:
+    def __init__(self, spatial_threshold, temporal_threshold, origin, latitude_band=DEFAULT_LATITUDE_BAND):
+        """Airspace occupancy: which drones are in each voxel during each time bucket.
+
+        The local frame around origin = (lat, long) is cut into cubic voxels of about
+        spatial_threshold meters and time into buckets of temporal_threshold seconds (at least
+        one second). Two samples closer than the thresholds always fall into neighbouring
+        cells, so a route is checked by looking up only its own cells and their neighbours:
+        the cost follows the route's length, not the number of drones filed.
+
+        Drones can be added and removed one at a time as missions are filed and cancelled.
+        Routes must stay within latitude_band degrees of the origin latitude.
+        """
+        self.spatial_threshold = float(spatial_threshold)
+        self.temporal_threshold = float(temporal_threshold)
+        self.origin = (float(origin[0]), float(origin[1]))
+        self.lat_min, self.lat_max = self.origin[0] - latitude_band, self.origin[0] + latitude_band
+        # Voxels are widened by the projection's worst stretch inside the band
+        slack = distance.projection_scale_slack(self.origin[0], self.lat_min, self.lat_max)
+        self.voxel_size = self.spatial_threshold * slack
+        self.time_bucket = max(self.temporal_threshold, 1.0)
+
+        self.cells = {}  # (x, y, z, time bucket) -> set of drone names
+        self.drones = {}  # drone name -> (path, list of occupied cells)
+        self.ids = {}  # drone name -> id used as sim_path in conflict intervals
+        self.names = []  # id -> drone name
+
+    @classmethod
+    def from_paths(cls, paths, spatial_threshold, temporal_threshold, chunk_size=1000):
+        """Grid holding every sim drone of a Paths object, centred on its primary path (or first drone)."""
+        grid = None
+        for chunk in paths.iter_sim_paths(chunk_size):
+            for sim_path in chunk:
+                if grid is None:
+                    reference = paths.primary_path if paths.primary_path is not None else sim_path
+                    grid = cls(spatial_threshold, temporal_threshold,
+                               (reference.trajectory.lat[0], reference.trajectory.long[0]))
+                grid.add(sim_path)
+        return grid
+
+    def __len__(self):
+        return len(self.drones)
+
+    def __contains__(self, name):
+        return name in self.drones
+
+    def _cells(self, trajectory):
+        """(N, 4) integer cell of every sample of trajectory."""
+        if len(trajectory) and (trajectory.lat.min() < self.lat_min or trajectory.lat.max() > self.lat_max):
+            raise ValueError("Trajectory leaves the latitude band covered by the grid")
+        xyz = distance.project_local(trajectory.coordinates(), self.origin)
+        cells = np.empty((len(trajectory), 4), dtype=np.int64)
+        cells[:, :3] = np.floor(xyz / self.voxel_size)
+        cells[:, 3] = np.floor(trajectory.timestamp / self.time_bucket)
+        return cells
+
+    def add(self, path):
+        """Files a drone under path.name, replacing any drone already filed under that name."""
+        if path.name is None:
+            raise ValueError("Drones in an occupancy grid need a name")
+        if path.name in self.drones:
+            self.remove(path.name)
+
+        occupied = [tuple(cell) for cell in np.unique(self._cells(path.trajectory), axis=0).tolist()]
+        for cell in occupied:
+            self.cells.setdefault(cell, set()).add(path.name)
+        self.drones[path.name] = (path, occupied)
+        if path.name not in self.ids:
+            self.ids[path.name] = len(self.names)
+            self.names.append(path.name)
+
+    def remove(self, name):
+        """Removes a filed drone; its cells are freed."""
+        _, occupied = self.drones.pop(name)
+        for cell in occupied:
+            members = self.cells[cell]
+            members.discard(name)
+            if not members:
+                del self.cells[cell]
+
+    def candidates(self, trajectory):
+        """Names of drones occupying any cell of trajectory or a neighbouring cell."""
+        own = np.unique(self._cells(trajectory), axis=0)
+        nearby = np.unique((own[:, None, :] + _NEIGHBOURS[None, :, :]).reshape(-1, 4), axis=0)
+        found = set()
+        for cell in map(tuple, nearby.tolist()):
+            members = self.cells.get(cell)
+            if members:
+                found.update(members)
+        return found
+
+    def conflicts(self, trajectory, exclude=None):
+        """Confirmed conflicts of trajectory with the filed drones, as conflict intervals.
+
+        Pairs of samples closer than spatial_threshold and at most temporal_threshold seconds
+        apart are merged as in Deconflict (see intervals.from_pairs()), with trajectory as
+        the primary; sim_path is the drone's id (names[sim_path] is its name). Only the
+        candidates() are compared; exclude names a drone to skip (e.g. the route itself).
+        """
+        by_id = {}
+        route_idx, drone_ids, drone_idx = [], [], []
+        for name in sorted(self.candidates(trajectory) - {exclude}):
+            path = by_id[self.ids[name]] = self.drones[name][0]
+            pairs = distance.space_time_pairs(trajectory, path.trajectory, self.spatial_threshold,
+                                              self.temporal_threshold)
+            route_idx.append(pairs[0])
+            drone_ids.append(np.full(len(pairs[0]), self.ids[name], dtype=np.int64))
+            drone_idx.append(pairs[1])
+        if not by_id:
+            return intervals.empty()
+        spacing = np.diff(trajectory.timestamp).max(initial=0.0)
+        return intervals.from_pairs(trajectory, np.concatenate(route_idx), np.concatenate(drone_ids),
+                                    np.concatenate(drone_idx), by_id, deconflict.MERGE_GAP_SAMPLES * spacing)
@@ -0,0 +1,155 @@
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import bounds
+import distance
+import spatial_index
+
+# Primary path as seen by a worker process (trajectory as views into shared memory)
+_shared = {}
+
+
+def share_samples(coords, times):
+    """Copies (N, 3) coordinates and N times into a new shared memory block, for attach_samples().
+
+    The caller owns the block: close() and unlink() it once the workers are done.
+    """
+    shm = shared_memory.SharedMemory(create=True, size=max(1, len(times) * 4 * 8))
+    try:
+        buffer = np.ndarray((len(times), 4), dtype=np.float64, buffer=shm.buf)
+        if len(times):
+            buffer[:, :3] = coords
+            buffer[:, 3] = times
+        del buffer
+    except BaseException:
+        shm.close()
+        shm.unlink()
+        raise
+    return shm
+
+
+def attach_samples(name, num_samples):
+    """Maps a share_samples() block in a worker: (shm, coords, times), the arrays being views without copies.
+
+    The views are only valid while shm stays referenced (and open).
+    """
+    shm = shared_memory.SharedMemory(name=name)
+    buffer = np.ndarray((num_samples, 4), dtype=np.float64, buffer=shm.buf)
+    return shm, buffer[:, :3], buffer[:, 3]
+
+
+def _attach_primary(name, num_points, waypoint_times, lower, upper):
+    """Worker initializer: maps the shared primary buffer without copying it; keeps the leg boxes."""
+    # The mapping is kept alive for the worker's lifetime
+    _shared['shm'], _shared['coords'], _shared['times'] = attach_samples(name, num_points)
+    _shared['waypoint_times'] = waypoint_times
+    _shared['lower'], _shared['upper'] = lower, upper
+
+
+def _match_block(first_sim, coords, times, waypoint_times, lower, upper, spatial_threshold, temporal_threshold,
+                 max_pairs_per_block):
+    """Worker task: matches the shared primary against one block of sim paths.
+
+    As in Deconflict.query_pruned(), only the samples on legs whose boxes may conflict are
+    indexed and queried. Returns (primary_idx, sim_idx, sim_point_idx, stats) with sim_idx
+    relative to the whole fleet and stats the pair counters of the query plus
+    sim_points_pruned.
+    """
+    primary_legs, sim_legs = bounds.conflicting_legs(
+        _shared['lower'], _shared['upper'], np.concatenate(lower), np.concatenate(upper), spatial_threshold,
+        np.inf if temporal_threshold is None else temporal_threshold, max_pairs_per_block)
+    sample_ids = [bounds.samples_on_legs(w, t, legs) for w, t, legs in
+                  zip(waypoint_times, times, np.split(sim_legs, np.cumsum([len(b) for b in lower])[:-1]))]
+    primary_ids = bounds.samples_on_legs(_shared['waypoint_times'], _shared['times'], primary_legs)
+    coords = [c[ids] for c, ids in zip(coords, sample_ids)]
+    primary_coords = _shared['coords'][primary_ids]
+
+    if temporal_threshold is None:
+        index = spatial_index.SpatialIndex.from_arrays(coords, [t[ids] for t, ids in zip(times, sample_ids)],
+                                                       spatial_threshold)
+        query_idx, point_ids = index.query_radius(primary_coords, spatial_threshold, max_pairs_per_block)
+    else:
+        index = spatial_index.SpatialIndex.from_arrays(
+            coords, [t[ids] for t, ids in zip(times, sample_ids)], spatial_threshold,
+            time_bucket=max(temporal_threshold, 1))
+        query_idx, point_ids = index.query_space_time(
+            primary_coords, _shared['times'][primary_ids], spatial_threshold, temporal_threshold, max_pairs_per_block)
+
+    stats = dict(index.last_query_stats)
+    stats['sim_points_pruned'] = sum(len(t) for t in times) - sum(len(ids) for ids in sample_ids)
+    # Back from pruned positions to the original sample and path indices
+    sim_idx, _ = index.locate(point_ids)
+    all_ids = np.concatenate(sample_ids) if sample_ids else np.empty(0, dtype=np.int64)
+    return primary_ids[query_idx], sim_idx + first_sim, all_ids[point_ids], stats
+
+
+def split_blocks(lengths, num_blocks):
+    """Splits paths into contiguous blocks holding roughly the same number of points."""
+    if len(lengths) == 0:
+        return []
+    cumulative = np.cumsum(lengths)
+    targets = cumulative[-1] * np.arange(1, num_blocks) / num_blocks
+    cuts = np.unique(np.searchsorted(cumulative, targets, side='right'))
+    bounds = np.concatenate(([0], cuts[(cuts > 0) & (cuts < len(lengths))], [len(lengths)]))
+    return [(int(a), int(b)) for a, b in zip(bounds[:-1], bounds[1:])]
+
+
+class ConflictPool:
+    def __init__(self, primary_path, workers, max_pairs_per_block=distance.DEFAULT_MAX_PAIRS_PER_BLOCK):
+        """Process pool matching one primary path against any number of sim path chunks.
+
+        The primary samples are placed in one shared memory buffer that every worker maps
+        directly, once for the pool's lifetime; use as a context manager (or call close()).
+        """
+        primary = primary_path.trajectory
+        self.workers = workers
+        self.max_pairs_per_block = max_pairs_per_block
+        self._shm = share_samples(primary.coordinates(), primary.timestamp)
+        try:
+            self._pool = ProcessPoolExecutor(
+                max_workers=workers, initializer=_attach_primary,
+                initargs=(self._shm.name, len(primary), primary_path.waypoints.timestamp,
+                          primary_path.bounds.lower, primary_path.bounds.upper))
+        except BaseException:
+            self._shm.close()
+            self._shm.unlink()
+            raise
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self._pool.shutdown()
+        self._shm.close()
+        self._shm.unlink()
+
+    def find_conflict_pairs(self, sim_paths, spatial_threshold, temporal_threshold):
+        """Matches the primary against sim_paths across the pool.
+
+        Sim paths are sent to workers in contiguous blocks. With temporal_threshold None only
+        the spatial test is applied. Returns (primary_idx, sim_idx, sim_point_idx, stats):
+        arrays covering all of sim_paths, in no particular order, and the workers' pair
+        counters summed.
+        """
+        # A few blocks per worker keeps the pool busy when path lengths vary
+        blocks = split_blocks(np.array([len(sim_path.trajectory) for sim_path in sim_paths]), self.workers * 4)
+        futures = [self._pool.submit(
+            _match_block, start, [sim_path.trajectory.coordinates() for sim_path in sim_paths[start:end]],
+            [sim_path.trajectory.timestamp for sim_path in sim_paths[start:end]],
+            [sim_path.waypoints.timestamp for sim_path in sim_paths[start:end]],
+            [sim_path.bounds.lower for sim_path in sim_paths[start:end]],
+            [sim_path.bounds.upper for sim_path in sim_paths[start:end]],
+            spatial_threshold, temporal_threshold, self.max_pairs_per_block) for start, end in blocks]
+        results = [future.result() for future in futures]
+
+        stats = {}
+        for result in results:
+            for name, value in result[3].items():
+                stats[name] = stats.get(name, 0) + value
+        if not results:
+            empty = np.empty(0, dtype=np.int64)
+            return empty, empty, empty, stats
+        return tuple(np.concatenate(parts) for parts in zip(*[result[:3] for result in results])) + (stats,)
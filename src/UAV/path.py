@@ -1,19 +1,62 @@
 import pandas as pd
 import numpy as np
-from geopy.distance import geodesic
 import json
 import glob
 import os
+import distance
+import trajectory
+import cache
+import fleet
+import bounds
+from instrumentation import NULL_INSTRUMENTATION
 
 class Path:
-    def __init__(self, path_csv, path_json):
-        self.waypoints = []
-        self.wp_data = self.load_csv(path_csv)
+    def __init__(self, path_csv, path_json, sample_interval=1.0):
+        """Loads a path and samples it every sample_interval seconds (i.e. at 1 / sample_interval Hz)."""
+        if sample_interval <= 0:
+            raise ValueError("sample_interval must be positive")
+        self.sample_interval = sample_interval
+        self.name = os.path.splitext(os.path.basename(path_csv))[0]  # Drone identifier, e.g. sim_drone_1
         self.start_time,self.end_time = self.load_json(path_json)
         self.duration = self.end_time - self.start_time
-        self.num_waypoints = len(self.wp_data)
-        self.wp_data = self.interpolate()
-        #print(self.wp_data)
+        self.waypoints = self.load_waypoints(path_csv)  # Original waypoints, kept for segment-based checks
+        self.num_waypoints = len(self.waypoints)
+        # Space-time boxes per leg, used to skip drones and legs that cannot conflict
+        self.bounds = bounds.BoundingVolume.from_waypoints(self.waypoints, self.start_time, self.end_time)
+        self.trajectory = self.interpolate()
+
+    @classmethod
+    def from_waypoints(cls, coords, start_time, end_time, sample_interval=1.0, name=None):
+        """Builds and interpolates a Path from (N, 3) lat/long/alt waypoints and its time window."""
+        path = cls.__new__(cls)
+        path.sample_interval = sample_interval
+        path.name = name
+        path.start_time, path.end_time = start_time, end_time
+        path.duration = end_time - start_time
+        path.waypoints = path.make_waypoints(np.asarray(coords, dtype=float))
+        path.num_waypoints = len(path.waypoints)
+        path.bounds = bounds.BoundingVolume.from_waypoints(path.waypoints, start_time, end_time)
+        path.trajectory = path.interpolate()
+        return path
+
+    @classmethod
+    def from_trajectories(cls, waypoints, trajectory, start_time, end_time, sample_interval=1.0, name=None):
+        """Rebuilds a Path from already interpolated data (e.g. from the on-disk cache)."""
+        path = cls.__new__(cls)
+        path.sample_interval = sample_interval
+        path.name = name
+        path.start_time, path.end_time = start_time, end_time
+        path.duration = end_time - start_time
+        path.waypoints = waypoints
+        path.num_waypoints = len(waypoints)
+        path.bounds = bounds.BoundingVolume.from_waypoints(waypoints, start_time, end_time)
+        path.trajectory = trajectory
+        return path
+
+    @property
+    def wp_data(self):
+        """DataFrame view of the interpolated trajectory, built on request."""
+        return self.trajectory.to_dataframe()
 
     def load_csv(self, path_csv):
         return(pd.read_csv(path_csv))
@@ -24,65 +67,184 @@ class Path:
             start_time = data['T_start']
             end_time = data['T_end']
         return (start_time,end_time)
-    
+
+    def load_waypoints(self, path_csv):
+        """Reads the waypoint CSV into a Trajectory timed at constant speed along the route."""
+        return self.make_waypoints(self.load_csv(path_csv)[['lat', 'long', 'alt']].to_numpy(dtype=float))
+
+    def make_waypoints(self, coords):
+        """Wraps (N, 3) lat/long/alt waypoints into a Trajectory timed at constant speed along the route."""
+        return trajectory.Trajectory(coords[:, 0], coords[:, 1], coords[:, 2], self.waypoint_times(coords))
+
     def calculate_total_distance(self):
         """Calculates total distance along the waypoints."""
+        from geopy.distance import geodesic  # Only needed here; keeps geopy out of the headless imports
         total_distance = 0.0
-        for i in range(1, len(self.wp_data)):
-            coord1 = (self.wp_data.loc[i-1, 'lat'], self.wp_data.loc[i-1, 'long'])
-            coord2 = (self.wp_data.loc[i, 'lat'], self.wp_data.loc[i, 'long'])
+        for i in range(1, len(self.waypoints)):
+            coord1 = (self.waypoints.lat[i-1], self.waypoints.long[i-1])
+            coord2 = (self.waypoints.lat[i], self.waypoints.long[i])
             total_distance += geodesic(coord1, coord2).meters  # Distance in meters
         return total_distance
 
+    def waypoint_times(self, coords):
+        """Time at which each waypoint is reached, assuming constant speed along the route."""
+        legs = distance.distance_3d(coords[:-1, 0], coords[:-1, 1], coords[:-1, 2],
+                                    coords[1:, 0], coords[1:, 1], coords[1:, 2])
+        cumulative = np.concatenate(([0.0], np.cumsum(legs)))
+
+        if len(coords) > 1 and cumulative[-1] > 0:
+            fraction = cumulative / cumulative[-1]
+        else:
+            fraction = np.linspace(0.0, 1.0, len(coords))
+        return self.start_time + fraction * self.duration
+
+    def resample(self):
+        """Samples the route every sample_interval seconds from start_time to end_time.
+
+        Positions are placed by cumulative distance along the waypoints (constant speed),
+        so each timestamp matches where the drone actually is. Returns (lat, long, alt,
+        timestamp) arrays.
+        """
+        num_samples = int(np.floor(max(self.duration, 0) / self.sample_interval)) + 1
+        times = self.start_time + self.sample_interval * np.arange(num_samples)
+        if times[-1] < self.end_time:
+            times = np.append(times, self.end_time)  # Always include the end of the mission
+
+        waypoint_times = self.waypoints.timestamp
+        lat = np.interp(times, waypoint_times, self.waypoints.lat)
+        long = np.interp(times, waypoint_times, self.waypoints.long)
+        alt = np.interp(times, waypoint_times, self.waypoints.alt)
+        return lat, long, alt, times.astype(float)
+
     def interpolate(self):
-        """Interpolates waypoints to ensure equidistant points."""
-        interpolated_points = []
-        total_points = self.duration  # Total points based on time difference
-
-        for i in range(len(self.wp_data) - 1):
-            lat1, lon1, alt1 = self.wp_data.loc[i, ['lat', 'long', 'alt']]
-            lat2, lon2, alt2 = self.wp_data.loc[i + 1, ['lat', 'long', 'alt']]
-
-            # Interpolate waypoints between each pair
-            segment_points = max(2, total_points // (self.num_waypoints - 1))
-            lats = np.linspace(lat1, lat2, segment_points)
-            lons = np.linspace(lon1, lon2, segment_points)
-            alts = np.linspace(alt1, alt2, segment_points)
-            times = np.linspace(self.start_time, self.end_time, total_points, dtype=int)
-
-            # Store interpolated points with corresponding times
-            for j in range(segment_points):
-                interpolated_points.append([lats[j], lons[j], alts[j], times[len(interpolated_points)]])
-        
-        return pd.DataFrame(interpolated_points, columns=['lat', 'long', 'alt', 'timestamp'])
+        """Interpolates waypoints into a time-driven Trajectory, see resample()."""
+        return trajectory.Trajectory(*self.resample())
 
 class Paths:
-    def __init__(self, sim_data_path='data/', primary_path_csv='primary_drone.csv', primary_path_json='primary_drone.json'):
+    def __init__(self, sim_data_path='data/', primary_path_csv='primary_drone.csv', primary_path_json='primary_drone.json', sample_interval=1.0, cache_dir=None, fleet_file=None, lazy=False, instrumentation=None):
+        """Loads the sim fleet from sim_data_path and the primary path.
+
+        When fleet_file is given, the sim fleet is read from that single fleet file (see
+        fleet.py) instead of the sim_drone_* files in sim_data_path.
+
+        When cache_dir is given, interpolated sim trajectories are stored there in binary
+        form and reused on later runs as long as the source files and sample_interval are
+        unchanged.
+
+        With lazy=True the sim fleet is not loaded up front (sim_paths is None); use
+        iter_sim_paths() to stream it chunk by chunk instead.
+
+        primary_path_csv=None loads only the sim fleet (primary_path is None), e.g. for
+        all-pairs deconfliction of the fleet itself.
+
+        instrumentation (an instrumentation.Instrumentation) times the loading stages.
+        """
         self.folder_path = sim_data_path
-        self.sim_paths = self.load_sim_paths()
+        self.sample_interval = sample_interval  # Seconds between interpolated samples
+        self.cache_dir = cache_dir
+        self.fleet_file = fleet_file
+        self.instrumentation = instrumentation if instrumentation is not None else NULL_INSTRUMENTATION
+        self.sim_paths = None if lazy else self.load_sim_paths()
 
+        self.primary_path = None
+        if primary_path_csv is None:
+            return
         primary_csv = os.path.join(os.getcwd(), primary_path_csv)
         primary_json = os.path.join(os.getcwd(), primary_path_json)
         
         # Load the primary path
-        self.primary_path = Path(primary_csv, primary_json)
+        with self.instrumentation.stage('load_primary'):
+            self.primary_path = Path(primary_csv, primary_json, self.sample_interval)
 
-    def load_sim_paths(self):
-        """Loads all sim_drone_*.csv and sim_drone_*.json files and creates Path objects."""
+    def find_sim_files(self):
+        """Returns sorted (csv, json) file pairs for all sim_drone_* files in the data folder."""
+        return Paths.find_sim_files_in(self.folder_path)
+
+    @staticmethod
+    def find_sim_files_in(folder_path):
+        """Returns sorted (csv, json) file pairs for all sim_drone_* files in folder_path."""
         # Find all matching CSV and JSON files
-        csv_files = glob.glob(os.path.join(self.folder_path, "sim_drone_*.csv"))
-        json_files = glob.glob(os.path.join(self.folder_path, "sim_drone_*.json"))
-        
-        sim_paths = []
-        
+        csv_files = sorted(glob.glob(os.path.join(folder_path, "sim_drone_*.csv")))
+        json_files = set(glob.glob(os.path.join(folder_path, "sim_drone_*.json")))
+
+        file_pairs = []
+
         # Ensure each CSV and JSON corresponds to the same number
         for csv_file in csv_files:
             # Match the CSV file with its corresponding JSON file
             json_file = csv_file.replace(".csv", ".json")
             if json_file in json_files:
-                # Create a Path object and add it to the paths list
-                sim_paths.append(Path(csv_file, json_file))
+                file_pairs.append((csv_file, json_file))
             else:
                 raise FileNotFoundError("File not found: " + json_file)
 
-        return sim_paths
\ No newline at end of file
+        return file_pairs
+
+    def num_sim_paths(self):
+        """Size of the sim fleet, without loading it."""
+        if self.sim_paths is not None:
+            return len(self.sim_paths)
+        if self.fleet_file is not None:
+            return len(fleet.FleetFile(self.fleet_file))
+        return len(self.find_sim_files())
+
+    def source_files(self):
+        """All files the sim fleet is read from."""
+        if self.fleet_file is not None:
+            return [self.fleet_file]
+        return [file for pair in self.find_sim_files() for file in pair]
+
+    def source_key(self):
+        """Key that changes whenever the sim source files or sample_interval change (os.stat only)."""
+        return cache.fleet_key(self.source_files(), self.sample_interval)
+
+    def load_sim_paths(self):
+        """Loads all sim_drone_*.csv and sim_drone_*.json files (or the fleet file) and creates Path objects."""
+        if self.fleet_file is None:
+            file_pairs = self.find_sim_files()
+
+        if self.cache_dir is not None:
+            key = self.source_key()
+            with self.instrumentation.stage('cache_load'):
+                cached = cache.load_fleet(self.cache_dir, key)
+            if cached is not None:
+                self.instrumentation.count('cache_hits')
+                return [Path.from_trajectories(waypoints, trajectory, start_time, end_time, self.sample_interval, name or None)
+                        for waypoints, trajectory, start_time, end_time, name in zip(*cached)]
+
+        # Parsing and interpolating every sim path
+        with self.instrumentation.stage('load_sim_paths'):
+            if self.fleet_file is not None:
+                sim_fleet = fleet.FleetFile(self.fleet_file)
+                sim_paths = [Path.from_waypoints(sim_fleet.waypoints(i), *sim_fleet.time_window(i), self.sample_interval,
+                                                 sim_fleet.names[i])
+                             for i in range(len(sim_fleet))]
+            else:
+                # Create a Path object for each pair
+                sim_paths = [Path(csv_file, json_file, self.sample_interval) for csv_file, json_file in file_pairs]
+
+        if self.cache_dir is not None:
+            with self.instrumentation.stage('cache_store'):
+                cache.store_fleet(self.cache_dir, key, sim_paths)
+        return sim_paths
+
+    def iter_sim_paths(self, chunk_size=1000):
+        """Yields the sim fleet as lists of at most chunk_size Path objects.
+
+        When the fleet is not already loaded, each chunk is read and interpolated only when
+        it is requested, so memory use depends on chunk_size rather than on the fleet size.
+        """
+        if self.sim_paths is not None:
+            for start in range(0, len(self.sim_paths), chunk_size):
+                yield self.sim_paths[start:start + chunk_size]
+        elif self.fleet_file is not None:
+            sim_fleet = fleet.FleetFile(self.fleet_file)
+            for start in range(0, len(sim_fleet), chunk_size):
+                yield [Path.from_waypoints(sim_fleet.waypoints(i), *sim_fleet.time_window(i), self.sample_interval,
+                                           sim_fleet.names[i])
+                       for i in range(start, min(start + chunk_size, len(sim_fleet)))]
+        else:
+            file_pairs = self.find_sim_files()
+            for start in range(0, len(file_pairs), chunk_size):
+                yield [Path(csv_file, json_file, self.sample_interval)
+                       for csv_file, json_file in file_pairs[start:start + chunk_size]]
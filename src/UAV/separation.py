@@ -0,0 +1,60 @@
+import numpy as np
+import distance
+import intervals
+import spatial_index
+
+
+class SeparationProfile:
+    def __init__(self, primary_path, sim_chunks, max_spatial, max_temporal,
+                 max_pairs_per_block=distance.DEFAULT_MAX_PAIRS_PER_BLOCK, count_query=None):
+        """Threshold-independent record of how close each sim drone gets to the primary.
+
+        Collects every (primary sample, sim sample) pair closer than max_spatial meters and
+        within max_temporal seconds, once, with its separation and time gap. Any threshold
+        pair inside those horizons is then answered by filtering these pairs, without
+        touching the trajectories or the spatial index again.
+
+        sim_chunks yields (index of the first sim path, list of sim paths), as produced by
+        Deconflict.sim_chunks(). count_query, if given, is called with the pair counters of
+        each chunk's index query (SpatialIndex.last_query_stats).
+        """
+        self.max_spatial = float(max_spatial)
+        self.max_temporal = float(max_temporal)
+        self.primary = primary = primary_path.trajectory
+
+        parts = []
+        for first, sim_paths in sim_chunks:
+            index = spatial_index.SpatialIndex(sim_paths, self.max_spatial, time_bucket=max(self.max_temporal, 1))
+            primary_idx, point_ids = index.query_space_time(
+                primary.coordinates(), primary.timestamp, self.max_spatial, self.max_temporal, max_pairs_per_block)
+            if count_query is not None:
+                count_query(index.last_query_stats)
+            sim_idx, sim_point_idx = index.locate(point_ids)
+
+            separation = distance.distance_3d(primary.lat[primary_idx], primary.long[primary_idx], primary.alt[primary_idx],
+                                              index.coords[point_ids, 0], index.coords[point_ids, 1], index.coords[point_ids, 2])
+            time_gap = np.abs(primary.timestamp[primary_idx] - index.times[point_ids])
+            parts.append((sim_idx + first, primary_idx, sim_point_idx, separation, time_gap,
+                          index.times[point_ids], index.coords[point_ids]))
+
+        if parts:
+            columns = [np.concatenate(column) for column in zip(*parts)]
+        else:
+            columns = [np.empty(0, dtype=np.int64)] * 3 + [np.empty(0)] * 3 + [np.empty((0, 3))]
+
+        (self.sim_idx, self.primary_idx, self.sim_point_idx, self.separation, self.time_gap,
+         self.sim_time, self.sim_location) = columns
+
+    def covers(self, spatial_threshold, temporal_threshold):
+        """True if the profile can answer this threshold pair exactly."""
+        return spatial_threshold <= self.max_spatial and temporal_threshold <= self.max_temporal
+
+    def intervals(self, spatial_threshold, temporal_threshold, max_gap):
+        """Conflict intervals for these thresholds (see intervals.merge()), without the sim trajectories."""
+        if not self.covers(spatial_threshold, temporal_threshold):
+            raise ValueError("Thresholds are outside the profile horizon")
+        mask = (self.separation < spatial_threshold) & (self.time_gap <= temporal_threshold)
+        primary_idx = self.primary_idx[mask]
+        return intervals.merge(self.sim_idx[mask], self.primary.timestamp[primary_idx], self.sim_time[mask],
+                               self.separation[mask], self.primary[primary_idx].coordinates(),
+                               self.sim_location[mask], max_gap)
@@ -0,0 +1,289 @@
+import argparse
+import asyncio
+import copy
+import json
+import socket
+import sys
+import time
+import numpy as np
+import deconflict
+import distance
+import intervals
+import path
+import spatial_index
+
+# Long-running deconfliction service: the sim fleet is loaded once and checked against
+# submitted primary missions. Requests and responses are JSON Lines over TCP or a Unix socket.
+
+# Longest wait (seconds) for more requests to join a batch once one has arrived
+DEFAULT_BATCH_WINDOW = 0.005
+
+# Most missions answered by one batched index query
+DEFAULT_MAX_BATCH = 256
+
+# Most samples one submitted mission may interpolate to (about 11 days at 1 Hz)
+MAX_MISSION_SAMPLES = 1_000_000
+
+# Space-time indexes kept hot, one per threshold pair (least recently used is dropped)
+MAX_CACHED_INDEXES = 4
+
+
+class DeconflictionService:
+    def __init__(self, paths, spatial_threshold=5, temporal_threshold=5, method='points',
+                 max_pairs_per_block=distance.DEFAULT_MAX_PAIRS_PER_BLOCK):
+        """Checks submitted primary missions against the sim fleet of an eagerly loaded Paths object.
+
+        The sim trajectories stay in memory, and so do the space-time indexes over them (one
+        per threshold pair, see index()). In 'points' mode a batch of missions is answered
+        with a single index query over all their samples; 'segments' missions are checked
+        one by one with Deconflict. Results match Deconflict's for the same thresholds.
+        """
+        if paths.sim_paths is None:
+            raise ValueError("The service needs the sim fleet loaded in memory (lazy=False)")
+        self.paths = paths
+        self.sim_paths = paths.sim_paths
+        self.sample_interval = paths.sample_interval
+        self.spatial_threshold = spatial_threshold
+        self.temporal_threshold = temporal_threshold
+        self.method = method
+        self.max_pairs_per_block = max_pairs_per_block
+        self._indexes = {}  # (spatial, temporal) -> SpatialIndex, oldest first
+
+    def index(self, spatial_threshold, temporal_threshold):
+        """Space-time index over every sim sample, sized for these thresholds and kept for later batches."""
+        key = (float(spatial_threshold), float(temporal_threshold))
+        index = self._indexes.pop(key, None)
+        if index is None:
+            index = spatial_index.SpatialIndex(self.sim_paths, spatial_threshold,
+                                               time_bucket=max(temporal_threshold, 1))
+            if len(self._indexes) >= MAX_CACHED_INDEXES:
+                del self._indexes[next(iter(self._indexes))]
+        self._indexes[key] = index
+        return index
+
+    def mission(self, request):
+        """Path of a submitted mission: {"waypoints": [[lat, long, alt], ...], "T_start": ..., "T_end": ...}."""
+        waypoints = np.asarray(request['waypoints'], dtype=float)
+        if waypoints.ndim != 2 or waypoints.shape[1] != 3 or len(waypoints) == 0:
+            raise ValueError("waypoints must be a non-empty list of [lat, long, alt]")
+        if not np.isfinite(waypoints).all():
+            raise ValueError("waypoints must be finite")
+        start_time, end_time = float(request['T_start']), float(request['T_end'])
+        if not (np.isfinite(start_time) and np.isfinite(end_time)) or end_time < start_time:
+            raise ValueError("T_start and T_end must be finite, with T_start <= T_end")
+        if (end_time - start_time) / self.sample_interval > MAX_MISSION_SAMPLES:
+            raise ValueError(f"Mission too long: more than {MAX_MISSION_SAMPLES} samples")
+        return path.Path.from_waypoints(waypoints, start_time, end_time, self.sample_interval, request.get('name'))
+
+    def check_batch(self, requests):
+        """Answers a list of mission requests; returns one JSON-ready response per request, in order.
+
+        Requests may override spatial_threshold, temporal_threshold and method. Points-mode
+        missions sharing thresholds are answered together by one index query.
+        """
+        start = time.perf_counter()
+        responses = [None] * len(requests)
+        groups = {}
+        for i, request in enumerate(requests):
+            try:
+                settings = (float(request.get('spatial_threshold', self.spatial_threshold)),
+                            float(request.get('temporal_threshold', self.temporal_threshold)),
+                            request.get('method', self.method))
+                if not all(np.isfinite(settings[:2])) or min(settings[:2]) <= 0:
+                    raise ValueError("spatial_threshold and temporal_threshold must be finite and positive")
+                if settings[2] not in ('points', 'segments'):
+                    raise ValueError(f"Unknown method: {settings[2]}")
+                mission = self.mission(request)
+            except (KeyError, TypeError, ValueError) as error:
+                responses[i] = {'id': request.get('id'), 'error': f"{type(error).__name__}: {error}"}
+                continue
+            groups.setdefault(settings, []).append((i, mission))
+
+        names = [sim_path.name for sim_path in self.sim_paths]
+        for (spatial_threshold, temporal_threshold, method), missions in groups.items():
+            try:
+                if method == 'points':
+                    results = self.check_points(missions, spatial_threshold, temporal_threshold)
+                else:
+                    results = [self.check_segments(mission, spatial_threshold, temporal_threshold)
+                               for _, mission in missions]
+            except Exception as error:
+                # Only the missions checked together fail; other groups of the batch are still answered
+                for i, _ in missions:
+                    responses[i] = {'id': requests[i].get('id'), 'error': f"{type(error).__name__}: {error}"}
+                continue
+            for (i, _), result in zip(missions, results):
+                responses[i] = {
+                    'id': requests[i].get('id'),
+                    'conflict': bool(len(result)),
+                    'spatial_threshold': spatial_threshold,
+                    'temporal_threshold': temporal_threshold,
+                    'method': method,
+                    'conflicts': intervals.to_records(result, names),
+                    'batch_size': len(requests)
+                }
+
+        elapsed = time.perf_counter() - start
+        for response in responses:
+            response['detect_s'] = elapsed
+        return responses
+
+    def check_points(self, missions, spatial_threshold, temporal_threshold):
+        """Conflict intervals of each (request position, Path) mission, from one query of the hot index."""
+        if not missions:
+            return []
+        trajectories = [mission.trajectory for _, mission in missions]
+        lengths = np.array([len(t) for t in trajectories])
+        offsets = np.concatenate(([0], np.cumsum(lengths)))
+        index = self.index(spatial_threshold, temporal_threshold)
+        query_idx, point_ids = index.query_space_time(
+            np.concatenate([t.coordinates() for t in trajectories]), np.concatenate([t.timestamp for t in trajectories]),
+            spatial_threshold, temporal_threshold, self.max_pairs_per_block)
+        sim_idx, sim_point_idx = index.locate(point_ids)
+
+        # Matches split back per mission
+        owner = np.searchsorted(offsets, query_idx, side='right') - 1
+        order = np.argsort(owner, kind='stable')
+        bounds = np.searchsorted(owner[order], np.arange(len(missions) + 1))
+        results = []
+        for k, trajectory in enumerate(trajectories):
+            group = order[bounds[k]:bounds[k + 1]]
+            results.append(intervals.from_pairs(
+                trajectory, query_idx[group] - offsets[k], sim_idx[group], sim_point_idx[group], self.sim_paths,
+                deconflict.MERGE_GAP_SAMPLES * self.sample_interval))
+        return results
+
+    def check_segments(self, mission, spatial_threshold, temporal_threshold):
+        """Conflict intervals of one mission in segments mode, through Deconflict."""
+        # A shallow copy carries the mission, so the shared Paths object is never modified
+        paths = copy.copy(self.paths)
+        paths.primary_path = mission
+        result = deconflict.Deconflict(paths, spatial_threshold, temporal_threshold, self.max_pairs_per_block,
+                                       method='segments', verbose=False)
+        return result.spatial_temporal_conflict_results
+
+    async def serve(self, host='127.0.0.1', port=8765, unix_path=None, batch_window=DEFAULT_BATCH_WINDOW,
+                    max_batch=DEFAULT_MAX_BATCH, ready=None):
+        """Serves requests until cancelled.
+
+        Each line a client sends is one JSON request; each response line echoes its "id".
+        Requests arriving within batch_window seconds of each other (from any client) are
+        checked together, up to max_batch at a time. Checks run on a worker thread, so the
+        event loop keeps accepting requests meanwhile. ready(server) is called once listening.
+        """
+        pending = asyncio.Queue()
+
+        async def handle(reader, writer):
+            replies = []
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                try:
+                    request = json.loads(line)
+                    if not isinstance(request, dict):
+                        raise ValueError("a request must be a JSON object")
+                except ValueError as error:
+                    writer.write((json.dumps({'id': None, 'error': f"Invalid request: {error}"}) + "\n").encode())
+                    continue
+                future = asyncio.get_running_loop().create_future()
+                await pending.put((request, future))
+                replies.append(asyncio.ensure_future(reply(writer, future)))
+            await asyncio.gather(*replies)
+            writer.close()
+
+        async def reply(writer, future):
+            response = await future
+            writer.write((json.dumps(response) + "\n").encode())
+            await writer.drain()
+
+        async def batches():
+            loop = asyncio.get_running_loop()
+            while True:
+                batch = [await pending.get()]
+                deadline = loop.time() + batch_window
+                while len(batch) < max_batch:
+                    try:
+                        batch.append(await asyncio.wait_for(pending.get(), max(0, deadline - loop.time())))
+                    except asyncio.TimeoutError:
+                        break
+                try:
+                    responses = await loop.run_in_executor(None, self.check_batch, [r for r, _ in batch])
+                except Exception as error:
+                    responses = [{'id': r.get('id'), 'error': f"{type(error).__name__}: {error}"} for r, _ in batch]
+                for (_, future), response in zip(batch, responses):
+                    future.set_result(response)
+
+        if unix_path is not None:
+            server = await asyncio.start_unix_server(handle, path=unix_path)
+        else:
+            server = await asyncio.start_server(handle, host, port)
+        worker = asyncio.ensure_future(batches())
+        try:
+            async with server:
+                if ready is not None:
+                    ready(server)
+                await server.serve_forever()
+        finally:
+            worker.cancel()
+
+
+def check_missions(missions, host='127.0.0.1', port=8765, unix_path=None):
+    """Client helper: submits mission requests to a running service and returns the responses in order.
+
+    All requests are sent before any response is read, so they can be batched together.
+    """
+    if unix_path is not None:
+        connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        connection.connect(unix_path)
+    else:
+        connection = socket.create_connection((host, port))
+    with connection:
+        requests = [{'id': i, **mission} if 'id' not in mission else mission for i, mission in enumerate(missions)]
+        connection.sendall("".join(json.dumps(request) + "\n" for request in requests).encode())
+        connection.shutdown(socket.SHUT_WR)
+        with connection.makefile('r') as stream:
+            responses = {response['id']: response for response in map(json.loads, stream)}
+    return [responses.get(request['id']) for request in requests]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Serve deconfliction checks against an in-memory sim fleet. Send one JSON object per line: "
+                    '{"id": 1, "waypoints": [[lat, long, alt], ...], "T_start": ..., "T_end": ...} '
+                    "(optionally spatial_threshold, temporal_threshold, method); one JSON result comes back per line.")
+    parser.add_argument('--sim-data', default='data/', help="folder with sim_drone_*.csv/.json files")
+    parser.add_argument('--fleet-file', help="read the sim fleet from this fleet file instead (see fleet.py)")
+    parser.add_argument('--cache-dir', help="reuse interpolated sim trajectories cached in this folder")
+    parser.add_argument('--sample-interval', type=float, default=1.0)
+    parser.add_argument('--spatial-threshold', type=float, default=5.0)
+    parser.add_argument('--temporal-threshold', type=float, default=5.0)
+    parser.add_argument('--method', choices=['points', 'segments'], default='points')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--unix', help="listen on this Unix socket path instead of TCP")
+    parser.add_argument('--batch-window', type=float, default=DEFAULT_BATCH_WINDOW,
+                        help="seconds to wait for more requests to batch together")
+    parser.add_argument('--max-batch', type=int, default=DEFAULT_MAX_BATCH)
+    args = parser.parse_args(argv)
+
+    paths = path.Paths(args.sim_data, None, None, args.sample_interval, cache_dir=args.cache_dir,
+                       fleet_file=args.fleet_file)
+    service = DeconflictionService(paths, args.spatial_threshold, args.temporal_threshold, args.method)
+    service.index(args.spatial_threshold, args.temporal_threshold)  # Warm the default index before serving
+
+    def ready(server):
+        where = args.unix or f"{args.host}:{args.port}"
+        print(f"Serving {len(paths.sim_paths)} sim drones on {where}", file=sys.stderr, flush=True)
+
+    try:
+        asyncio.run(service.serve(args.host, args.port, args.unix, args.batch_window, args.max_batch, ready))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
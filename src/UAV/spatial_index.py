@@ -0,0 +1,190 @@
+import numpy as np
+import distance
+
+# Large odd multipliers used to hash integer cell coordinates into a single int64 key
+_HASH_PRIMES = np.array([73856093, 19349663, 83492791, 2654435761], dtype=np.int64)
+
+
+def local_frame(coords):
+    """(origin, slack) of the projected frame an index over these (N, 3) lat/long/alt coordinates uses.
+
+    slack is the projection's worst stretch over the coordinates; SpatialIndex widens its
+    cells by it, so a cell_size of the query radius keeps the search to adjacent cells.
+    """
+    if len(coords) == 0:
+        return (0.0, 0.0), 1.0
+    lat_min, lat_max = coords[:, 0].min(), coords[:, 0].max()
+    lon_min, lon_max = coords[:, 1].min(), coords[:, 1].max()
+    origin = (0.5 * (lat_min + lat_max), 0.5 * (lon_min + lon_max))
+    # Widen the band by ~1 km so query points just outside the fleet are covered too
+    return origin, distance.projection_scale_slack(origin[0], lat_min - 0.01, lat_max + 0.01)
+
+
+class SpatialIndex:
+    def __init__(self, sim_paths, cell_size, time_bucket=None):
+        """Builds a uniform grid hash over the waypoints of all sim paths.
+
+        Points are projected onto a local metric frame and bucketed into cubic cells of
+        cell_size meters, widened by the projection's stretch (see local_frame()), so queries
+        with a radius up to cell_size only look at adjacent cells. When time_bucket (seconds) is given, cells are additionally split
+        by time so that space-time queries never look at points far apart in time. A query
+        then only looks at the cells around each query point instead of every sim waypoint.
+        """
+        coords = [sim_path.trajectory.coordinates() for sim_path in sim_paths]
+        times = [sim_path.trajectory.timestamp for sim_path in sim_paths]
+        self._build(coords, times, cell_size, time_bucket)
+
+    @classmethod
+    def from_arrays(cls, coords, times, cell_size, time_bucket=None):
+        """Builds an index from per-path (N, 3) lat/long/alt arrays and (N,) timestamp arrays."""
+        index = cls.__new__(cls)
+        index._build(coords, times, cell_size, time_bucket)
+        return index
+
+    def _build(self, coords, times, cell_size, time_bucket):
+        if cell_size <= 0:
+            raise ValueError("cell_size must be positive")
+        self.time_bucket = float(time_bucket) if time_bucket is not None else None
+        if self.time_bucket is not None and self.time_bucket <= 0:
+            raise ValueError("time_bucket must be positive")
+
+        lengths = np.array([len(c) for c in coords], dtype=np.int64)
+        self.offsets = np.concatenate(([0], np.cumsum(lengths)))  # start of each sim path in coords
+        self.coords = np.concatenate(coords).astype(float, copy=False) if coords else np.empty((0, 3))
+        self.times = np.concatenate(times).astype(float, copy=False) if times else np.empty(0)
+
+        self.origin, self.slack = local_frame(self.coords)
+        # Projected cell edge; the margin keeps reach at 1 despite rounding when radius == cell_size
+        self.cell_size = float(cell_size) * self.slack * (1 + 1e-9)
+        self.xyz = distance.project_local(self.coords, self.origin) if len(self.coords) else np.empty((0, 3))
+
+        keys = self._cell_keys(self._cells(self.xyz, self.times))
+        self.order = np.argsort(keys, kind='stable')  # point ids sorted by cell key
+        self.last_query_stats = None
+        self.sorted_keys = keys[self.order]
+
+    def _cells(self, xyz, times):
+        """Integer grid cell of each point: (x, y, z) or (x, y, z, time bucket)."""
+        cells = np.floor(xyz / self.cell_size).astype(np.int64)
+        if self.time_bucket is None:
+            return cells
+        buckets = np.floor(np.asarray(times, dtype=float) / self.time_bucket).astype(np.int64)
+        return np.concatenate((cells, buckets[:, None]), axis=1)
+
+    def _cell_keys(self, cells):
+        """Hashes integer cells to int64 keys; collisions only add candidates that get filtered later."""
+        return np.bitwise_xor.reduce(cells * _HASH_PRIMES[:cells.shape[-1]], axis=-1)
+
+    def locate(self, point_ids):
+        """Maps global point ids to (sim path index, waypoint index within that path)."""
+        sim_idx = np.searchsorted(self.offsets, point_ids, side='right') - 1
+        return sim_idx, point_ids - self.offsets[sim_idx]
+
+    def query_radius(self, query_coords, radius, max_pairs_per_block=distance.DEFAULT_MAX_PAIRS_PER_BLOCK):
+        """Finds all (query index, global point id) pairs closer than radius meters.
+
+        Candidates from neighbouring cells are confirmed with distance.distance_3d, so the
+        result is the same as a brute force scan. Queries are processed in blocks so that
+        at most about max_pairs_per_block candidates are held at once.
+        """
+        if self.time_bucket is not None:
+            raise ValueError("query_radius needs an index built without time_bucket")
+        return self._query(query_coords, None, radius, None, max_pairs_per_block)
+
+    def query_space_time(self, query_coords, query_times, radius, time_window,
+                         max_pairs_per_block=distance.DEFAULT_MAX_PAIRS_PER_BLOCK):
+        """Finds all (query index, global point id) pairs closer than radius meters and within time_window seconds.
+
+        Candidates are first reduced to neighbouring space-time cells, then filtered on the
+        time difference, and only the survivors have their distance computed.
+        """
+        if self.time_bucket is None:
+            raise ValueError("query_space_time needs an index built with time_bucket")
+        return self._query(query_coords, query_times, radius, time_window, max_pairs_per_block)
+
+    def _neighbours(self, radius, time_window=None):
+        """(K, D) offsets to the cells a query point looks up for this radius and time window."""
+        reach = int(np.ceil(radius * self.slack / self.cell_size))
+        steps = [np.arange(-reach, reach + 1)] * 3
+        if self.time_bucket is not None:
+            time_reach = int(np.ceil(time_window / self.time_bucket))
+            steps.append(np.arange(-time_reach, time_reach + 1))
+        return np.stack(np.meshgrid(*steps, indexing='ij'), axis=-1).reshape(-1, len(steps))
+
+    def neighbour_count(self, radius, time_window=None):
+        """Cells a query point looks up for this radius (and time window, on a space-time index)."""
+        return len(self._neighbours(radius, time_window))
+
+    def _query(self, query_coords, query_times, radius, time_window, max_pairs_per_block):
+        query_coords = np.asarray(query_coords, dtype=float)
+        empty = np.empty(0, dtype=np.int64)
+        # Work done by the latest query, for instrumentation
+        self.last_query_stats = stats = {'candidate_pairs': 0, 'time_pruned': 0, 'distance_evaluations': 0, 'matches': 0}
+        if len(query_coords) == 0 or len(self.coords) == 0:
+            return empty, empty
+
+        if query_times is not None:
+            query_times = np.asarray(query_times, dtype=float)
+        neighbours = self._neighbours(radius, time_window)
+
+        query_xyz = distance.project_local(query_coords, self.origin)
+        # Rows per block: the (rows, K) neighbour keys and ranges stay within max_pairs_per_block entries too
+        rows = max(1, max_pairs_per_block // len(neighbours))
+
+        query_ids = []
+        point_ids = []
+        for row_start in range(0, len(query_coords), rows):
+            row_end = min(row_start + rows, len(query_coords))
+            row_times = query_times[row_start:row_end] if query_times is not None else None
+            query_cells = self._cells(query_xyz[row_start:row_end], row_times)
+            keys = self._cell_keys(query_cells[:, None, :] + neighbours[None, :, :])  # (rows, K)
+            # Neighbouring cells can hash to the same key; look each distinct key up only once
+            keys = np.sort(keys, axis=1)
+            duplicate = np.zeros(keys.shape, dtype=bool)
+            duplicate[:, 1:] = keys[:, 1:] == keys[:, :-1]
+
+            starts = np.searchsorted(self.sorted_keys, keys, side='left')
+            ends = np.where(duplicate, starts, np.searchsorted(self.sorted_keys, keys, side='right'))
+            cumulative = np.cumsum((ends - starts).sum(axis=1))
+
+            block_start = 0
+            while block_start < len(keys):
+                done = cumulative[block_start - 1] if block_start else 0
+                block_end = int(np.searchsorted(cumulative, done + max_pairs_per_block, side='right'))
+                block_end = max(block_end, block_start + 1)
+
+                q, p = self._expand(starts[block_start:block_end], ends[block_start:block_end])
+                q += row_start + block_start
+                stats['candidate_pairs'] += len(q)
+                if query_times is not None:
+                    # Time pruning first: cheap, and removes most spatially close candidates
+                    keep = np.abs(query_times[q] - self.times[p]) <= time_window
+                    stats['time_pruned'] += len(q) - int(keep.sum())
+                    q, p = q[keep], p[keep]
+                if len(q):
+                    dist = distance.distance_3d(query_coords[q, 0], query_coords[q, 1], query_coords[q, 2],
+                                                self.coords[p, 0], self.coords[p, 1], self.coords[p, 2])
+                    keep = dist < radius
+                    stats['distance_evaluations'] += len(q)
+                    stats['matches'] += int(keep.sum())
+                    query_ids.append(q[keep])
+                    point_ids.append(p[keep])
+                block_start = block_end
+
+        if not query_ids:
+            return empty, empty
+        return np.concatenate(query_ids), np.concatenate(point_ids)
+
+    def _expand(self, starts, ends):
+        """Turns per-query ranges into the sorted positions they cover, as flat (query, point id) arrays."""
+        counts = (ends - starts).ravel()
+        total = int(counts.sum())
+        if total == 0:
+            empty = np.empty(0, dtype=np.int64)
+            return empty, empty
+
+        query_of_range = np.repeat(np.arange(starts.shape[0]), starts.shape[1])
+        range_of_item = np.repeat(np.arange(len(counts)), counts)
+        first_item = np.cumsum(counts) - counts
+        positions = starts.ravel()[range_of_item] + (np.arange(total) - first_item[range_of_item])
+        return query_of_range[range_of_item], self.order[positions]
@@ -0,0 +1,113 @@
+import argparse
+import json
+import os
+import numpy as np
+import pandas as pd
+import distance
+
+# Defaults match the sample data around the Philadelphia test site
+DEFAULT_CENTER = (39.9607, -75.2080)
+DEFAULT_START_TIME = 1743306261
+
+
+def random_route(rng, num_waypoints, area_size, altitude_range, origin):
+    """Random walk of waypoints inside a square area of area_size meters around origin.
+
+    Returns an (N, 3) lat/long/alt array.
+    """
+    half = area_size / 2
+    xy = np.empty((num_waypoints, 2))
+    xy[0] = rng.uniform(-half, half, 2)
+    # Legs of a few hundred meters keep routes drone-like instead of jumping across the area
+    leg = min(area_size / 3, 600.0)
+    for k in range(1, num_waypoints):
+        xy[k] = np.clip(xy[k - 1] + rng.normal(0, leg, 2), -half, half)
+    alt = rng.uniform(altitude_range[0], altitude_range[1], num_waypoints)
+    return local_to_geodetic(np.column_stack((xy, alt)), origin)
+
+
+def local_to_geodetic(xyz, origin):
+    """Inverse of distance.project_local for the east/north/up offsets used here."""
+    lat0 = np.radians(origin[0])
+    meridional, prime_vertical = distance.radii_of_curvature(lat0)
+    lat = origin[0] + np.degrees(xyz[:, 1] / meridional)
+    lon = origin[1] + np.degrees(xyz[:, 0] / (prime_vertical * np.cos(lat0)))
+    return np.column_stack((lat, lon, xyz[:, 2]))
+
+
+def route_length(coords):
+    return float(distance.distance_3d(coords[:-1, 0], coords[:-1, 1], coords[:-1, 2],
+                                      coords[1:, 0], coords[1:, 1], coords[1:, 2]).sum())
+
+
+def generate_mission(rng, area_size=2000.0, altitude_range=(10.0, 120.0), waypoint_range=(2, 8),
+                     speed_range=(5.0, 15.0), time_span=3600.0, center=DEFAULT_CENTER,
+                     start_time=DEFAULT_START_TIME):
+    """One random mission: (waypoints (N, 3), T_start, T_end).
+
+    The mission starts uniformly within time_span seconds of start_time and lasts as long
+    as its route takes at a random constant speed.
+    """
+    num_waypoints = int(rng.integers(waypoint_range[0], waypoint_range[1] + 1))
+    waypoints = random_route(rng, num_waypoints, area_size, altitude_range, center)
+    speed = rng.uniform(*speed_range)
+    t_start = start_time + int(rng.uniform(0, time_span))
+    t_end = t_start + max(1, int(np.ceil(route_length(waypoints) / speed)))
+    return waypoints, t_start, t_end
+
+
+def write_mission(csv_path, json_path, waypoints, t_start, t_end):
+    """Writes a mission in the project's CSV/JSON layout."""
+    pd.DataFrame(waypoints, columns=['lat', 'long', 'alt']).to_csv(csv_path, index=False, float_format='%.7f')
+    with open(json_path, 'w') as file:
+        json.dump({'T_start': int(t_start), 'T_end': int(t_end)}, file, indent=4)
+
+
+def generate_fleet(folder_path, num_drones, seed=0, **mission_options):
+    """Writes num_drones sim_drone_<i>.csv/.json pairs into folder_path.
+
+    The same seed and options always produce the same fleet. Density follows from
+    num_drones and area_size, time overlap from time_span (shorter span, more overlap);
+    see generate_mission() for the other options.
+    """
+    os.makedirs(folder_path, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    for i in range(num_drones):
+        waypoints, t_start, t_end = generate_mission(rng, **mission_options)
+        write_mission(os.path.join(folder_path, f"sim_drone_{i}.csv"),
+                      os.path.join(folder_path, f"sim_drone_{i}.json"), waypoints, t_start, t_end)
+
+
+def generate_primary(csv_path, json_path, seed=0, **mission_options):
+    """Writes one primary mission drawn from the same distribution as the fleet."""
+    # Separate stream from the fleet so adding drones never changes the primary
+    rng = np.random.default_rng([seed, 1])
+    write_mission(csv_path, json_path, *generate_mission(rng, **mission_options))
+
+
+def add_mission_arguments(parser):
+    """Command line options shared by the generator and the benchmark."""
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--area-size', type=float, default=2000.0, help="side of the square airspace (m)")
+    parser.add_argument('--altitude', type=float, nargs=2, default=(10.0, 120.0), metavar=('MIN', 'MAX'))
+    parser.add_argument('--waypoints', type=int, nargs=2, default=(2, 8), metavar=('MIN', 'MAX'))
+    parser.add_argument('--speed', type=float, nargs=2, default=(5.0, 15.0), metavar=('MIN', 'MAX'))
+    parser.add_argument('--time-span', type=float, default=3600.0, help="missions start within this many seconds")
+
+
+def mission_options(args):
+    return {'area_size': args.area_size, 'altitude_range': tuple(args.altitude), 'waypoint_range': tuple(args.waypoints),
+            'speed_range': tuple(args.speed), 'time_span': args.time_span}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Generate a deterministic synthetic sim fleet and primary mission.")
+    parser.add_argument('folder', help="output folder for sim_drone_*.csv/.json and primary_drone.csv/.json")
+    parser.add_argument('num_drones', type=int)
+    add_mission_arguments(parser)
+    args = parser.parse_args()
+
+    generate_fleet(args.folder, args.num_drones, args.seed, **mission_options(args))
+    generate_primary(os.path.join(args.folder, 'primary_drone.csv'), os.path.join(args.folder, 'primary_drone.json'),
+                     args.seed, **mission_options(args))
+    print(f"Wrote {args.num_drones} sim drones to {args.folder}")
@@ -0,0 +1,308 @@
+import argparse
+import asyncio
+import collections
+import json
+import sys
+import time
+import numpy as np
+import pandas as pd
+import deconflict
+import distance
+import intervals
+import spatial_index
+import trajectory
+
+# Live telemetry: position reports stream in, each drone keeps a short track of its recent
+# and predicted positions, and conflicts are re-evaluated once per tick for the drones that
+# reported since the last tick.
+
+# Columns of a telemetry replay CSV, one row per position report
+REPLAY_COLUMNS = ['drone', 'timestamp', 'lat', 'long', 'alt']
+
+
+class Track:
+    """A drone's current track: recent reports followed by predicted positions."""
+    __slots__ = ('name', 'trajectory')
+
+    def __init__(self, name, trajectory):
+        self.name = name
+        self.trajectory = trajectory
+
+
+class TelemetryMonitor:
+    def __init__(self, spatial_threshold=5, temporal_threshold=5, window=30.0, horizon=10.0, prediction_step=1.0,
+                 max_pairs_per_block=distance.DEFAULT_MAX_PAIRS_PER_BLOCK):
+        """Rolling-window conflict detection over live position reports.
+
+        Each drone keeps its reports from the last window seconds, followed by positions
+        predicted every prediction_step seconds up to horizon seconds past its latest report
+        (constant velocity from its last two reports). Two drones are in conflict when their
+        tracks come closer than spatial_threshold within temporal_threshold seconds, as in
+        Deconflict; predicted conflicts are raised before they happen.
+
+        update() only records a report. tick() rebuilds the tracks of the drones that
+        reported since the last tick and checks only their samples, in one query of a
+        space-time index over all tracks; conflicts between drones that did not move are
+        kept as they are.
+        """
+        self.spatial_threshold = spatial_threshold
+        self.temporal_threshold = temporal_threshold
+        self.window = float(window)
+        self.horizon = float(horizon)
+        self.prediction_step = float(prediction_step)
+        self.max_pairs_per_block = max_pairs_per_block
+
+        self.reports = {}  # drone name -> deque of (timestamp, lat, long, alt), oldest first
+        self.tracks = {}  # drone name -> Track as of the drone's latest tick
+        self.ids = {}  # drone name -> id used as sim_path in conflict intervals
+        self.names = []  # id -> drone name
+        self.conflicts = {}  # (name, other name), name < other -> conflict intervals, sim_path = id of other
+        self._dirty = set()
+        self.last_tick_stats = None
+
+    def update(self, name, timestamp, lat, long, alt):
+        """Records a position report; reports older than the drone's latest are ignored."""
+        history = self.reports.get(name)
+        if history is None:
+            history = self.reports[name] = collections.deque()
+            if name not in self.ids:
+                self.ids[name] = len(self.names)
+                self.names.append(name)
+        elif timestamp <= history[-1][0]:
+            return
+        history.append((float(timestamp), float(lat), float(long), float(alt)))
+        self._dirty.add(name)
+
+    def track(self, name):
+        """Trajectory of a drone's reports within the window, followed by its predicted positions."""
+        history = self.reports[name]
+        while history[-1][0] - history[0][0] > self.window:
+            history.popleft()
+        observed = np.array(history)
+
+        steps = self.prediction_step * np.arange(1, int(np.ceil(self.horizon / self.prediction_step)) + 1)
+        velocity = np.zeros(3)
+        if len(observed) > 1:
+            velocity = (observed[-1, 1:] - observed[-2, 1:]) / (observed[-1, 0] - observed[-2, 0])
+        predicted = np.column_stack((observed[-1, 0] + steps, observed[-1, 1:] + steps[:, None] * velocity))
+        samples = np.concatenate((observed, predicted))
+        return trajectory.Trajectory(samples[:, 1], samples[:, 2], samples[:, 3], samples[:, 0])
+
+    def tick(self, now=None):
+        """Re-evaluates conflicts for the drones that reported since the last tick. Returns a list of events.
+
+        Drones without a report within the window before now are dropped. Events are dicts
+        with 'event' ('conflict' for a new conflict, 'update' when its intervals changed,
+        'clear' when it ended), the two 'drones' and the conflict 'intervals' records of the
+        first drone against the second (see intervals.to_records()).
+        """
+        start = time.perf_counter()
+        if now is None:
+            now = time.time()
+        events = []
+
+        stale = [name for name, history in self.reports.items()
+                 if history[-1][0] < now - self.window and name not in self._dirty]
+        for name in stale:
+            del self.reports[name]
+            self.tracks.pop(name, None)
+            for pair in [pair for pair in self.conflicts if name in pair]:
+                events.append(self._event('clear', pair, self.conflicts.pop(pair)))
+
+        updated = sorted(self._dirty)
+        self._dirty = set()
+        for name in updated:
+            self.tracks[name] = Track(name, self.track(name))
+
+        found = self._find(updated) if updated else {}
+        moved = set(updated)
+        for pair in [pair for pair in self.conflicts if (pair[0] in moved or pair[1] in moved) and pair not in found]:
+            events.append(self._event('clear', pair, self.conflicts.pop(pair)))
+        for pair, result in found.items():
+            previous = self.conflicts.get(pair)
+            self.conflicts[pair] = result
+            if previous is None:
+                events.append(self._event('conflict', pair, result))
+            elif previous.tobytes() != result.tobytes():
+                events.append(self._event('update', pair, result))
+
+        self.last_tick_stats = {'drones': len(self.reports), 'updated': len(updated), 'dropped': len(stale),
+                                'conflicts': len(self.conflicts), 'tick_s': time.perf_counter() - start}
+        return events
+
+    def _find(self, updated):
+        """Conflict intervals of every pair involving an updated drone: {(name, other name): intervals}."""
+        names = list(self.tracks)
+        position = {name: k for k, name in enumerate(names)}
+        coords = [self.tracks[name].trajectory.coordinates() for name in names]
+        times = [self.tracks[name].trajectory.timestamp for name in names]
+        index = spatial_index.SpatialIndex.from_arrays(coords, times, self.spatial_threshold,
+                                                       time_bucket=max(self.temporal_threshold, 1))
+
+        # One query for the samples of every updated drone
+        query = [self.tracks[name].trajectory for name in updated]
+        offsets = np.concatenate(([0], np.cumsum([len(t) for t in query])))
+        query_idx, point_ids = index.query_space_time(
+            np.concatenate([t.coordinates() for t in query]), np.concatenate([t.timestamp for t in query]),
+            self.spatial_threshold, self.temporal_threshold, self.max_pairs_per_block)
+        other, other_idx = index.locate(point_ids)
+        owner = np.searchsorted(offsets, query_idx, side='right') - 1
+        own_idx = query_idx - offsets[owner]
+        owner = np.array([position[name] for name in updated], dtype=np.int64)[owner]
+
+        # Each pair once, seen from its first drone (by name); pairs of two updated drones are found twice
+        rank = np.argsort(np.argsort(np.array(names, dtype=object)))
+        is_updated = np.zeros(len(names), dtype=bool)
+        is_updated[[position[name] for name in updated]] = True
+        first_owns = rank[owner] < rank[other]
+        keep = (owner != other) & (first_owns | ~is_updated[other])
+        first = np.where(first_owns, owner, other)[keep]
+        second = np.where(first_owns, other, owner)[keep]
+        first_idx = np.where(first_owns, own_idx, other_idx)[keep]
+        second_idx = np.where(first_owns, other_idx, own_idx)[keep]
+
+        by_id = {self.ids[name]: self.tracks[name] for name in names}
+        second_ids = np.array([self.ids[name] for name in names], dtype=np.int64)[second]
+        found = {}
+        order = np.argsort(first, kind='stable')
+        for group in np.split(order, np.flatnonzero(np.diff(first[order])) + 1):
+            if len(group) == 0:
+                continue
+            name = names[first[group[0]]]
+            track = self.tracks[name].trajectory
+            # Reports may be further apart than the predicted samples; merge over the track's widest spacing
+            spacing = max(self.prediction_step, np.diff(track.timestamp).max(initial=0.0))
+            result = intervals.from_pairs(track, first_idx[group], second_ids[group],
+                                          second_idx[group], by_id, deconflict.MERGE_GAP_SAMPLES * spacing)
+            bounds = np.flatnonzero(np.diff(result.sim_path)) + 1
+            for part in np.split(result, bounds):
+                found[(name, self.names[part.sim_path[0]])] = part
+        return found
+
+    def _event(self, kind, pair, result):
+        return {'event': kind, 'drones': list(pair), 'intervals': intervals.to_records(result, self.names)}
+
+
+def read_replay(csv_path):
+    """Position reports of a replay CSV (see REPLAY_COLUMNS) as (timestamp, drone, lat, long, alt), in time order."""
+    reports = pd.read_csv(csv_path, dtype={'drone': str}).sort_values('timestamp', kind='stable')
+    return list(zip(reports['timestamp'], reports['drone'], reports['lat'], reports['long'], reports['alt']))
+
+
+def write_replay(paths, csv_path, report_interval=1.0):
+    """Writes the sim fleet of a Paths object as a replay CSV, one report per drone every report_interval seconds."""
+    frames = []
+    for i, sim_path in enumerate(paths.sim_paths):
+        samples = sim_path.trajectory
+        step = max(1, int(round(report_interval / sim_path.sample_interval)))
+        frame = samples[::step].to_dataframe()
+        frame.insert(0, 'drone', sim_path.name if sim_path.name is not None else str(i))
+        frames.append(frame)
+    replay = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=REPLAY_COLUMNS)
+    replay[REPLAY_COLUMNS].sort_values('timestamp', kind='stable').to_csv(csv_path, index=False)
+
+
+def run_replay(monitor, reports, tick_interval=1.0, speed=None):
+    """Replays time-ordered reports through monitor, ticking every tick_interval seconds of report time.
+
+    Yields (clock, events) per tick. With speed (e.g. 1.0 for real time) ticks are paced
+    on the wall clock; otherwise the replay runs as fast as possible.
+    """
+    if not reports:
+        return
+    clock = reports[0][0]
+    position = 0
+    next_tick = time.perf_counter()
+    while position < len(reports):
+        clock += tick_interval
+        while position < len(reports) and reports[position][0] <= clock:
+            timestamp, name, lat, long, alt = reports[position]
+            monitor.update(name, timestamp, lat, long, alt)
+            position += 1
+        yield clock, monitor.tick(clock)
+
+        if speed:
+            # A fixed tick rate: sleep off what is left of this tick, if anything
+            next_tick += tick_interval / speed
+            time.sleep(max(0.0, next_tick - time.perf_counter()))
+
+
+async def serve(monitor, emit, host='127.0.0.1', port=8766, unix_path=None, tick_interval=1.0, ready=None):
+    """Receives JSON Lines reports {"drone", "timestamp", "lat", "long", "alt"} and ticks every tick_interval seconds.
+
+    Reports are timed by their own timestamps (seconds since the epoch, like the mission
+    files); emit(now, events) is called after every tick. ready(server) is called once listening.
+    """
+    async def handle(reader, writer):
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            if not line.strip():
+                continue
+            try:
+                report = json.loads(line)
+                monitor.update(str(report['drone']), float(report['timestamp']), float(report['lat']),
+                               float(report['long']), float(report['alt']))
+            except (ValueError, KeyError, TypeError) as error:
+                writer.write((json.dumps({'error': f"Invalid report: {error}"}) + "\n").encode())
+        writer.close()
+
+    if unix_path is not None:
+        server = await asyncio.start_unix_server(handle, path=unix_path)
+    else:
+        server = await asyncio.start_server(handle, host, port)
+    loop = asyncio.get_running_loop()
+    async with server:
+        if ready is not None:
+            ready(server)
+        next_tick = loop.time()
+        while True:
+            next_tick += tick_interval
+            await asyncio.sleep(max(0.0, next_tick - loop.time()))
+            now = time.time()
+            emit(now, monitor.tick(now))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Rolling-window conflict detection over live telemetry. Prints one JSON object per conflict "
+                    "event (new, updated or cleared).")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--replay', help="replay position reports from a CSV with columns " + ",".join(REPLAY_COLUMNS))
+    source.add_argument('--port', type=int, help="receive JSON Lines reports on this TCP port (localhost)")
+    source.add_argument('--unix', help="receive JSON Lines reports on this Unix socket path")
+    parser.add_argument('--spatial-threshold', type=float, default=5.0)
+    parser.add_argument('--temporal-threshold', type=float, default=5.0)
+    parser.add_argument('--window', type=float, default=30.0, help="seconds of reports kept per drone")
+    parser.add_argument('--horizon', type=float, default=10.0, help="seconds of positions predicted per drone")
+    parser.add_argument('--tick', type=float, default=1.0, help="seconds between conflict evaluations")
+    parser.add_argument('--speed', type=float, help="replay speed relative to real time (default: as fast as possible)")
+    parser.add_argument('--stats', action='store_true', help="also print the statistics of every tick")
+    args = parser.parse_args(argv)
+
+    monitor = TelemetryMonitor(args.spatial_threshold, args.temporal_threshold, args.window, args.horizon)
+
+    def emit(now, events):
+        for event in events:
+            print(json.dumps({'time': now, **event}), flush=True)
+        if args.stats:
+            print(json.dumps({'time': now, 'tick': monitor.last_tick_stats}), flush=True)
+
+    if args.replay:
+        for now, events in run_replay(monitor, read_replay(args.replay), args.tick, args.speed):
+            emit(now, events)
+        return 0
+
+    def ready(server):
+        print(f"Listening for telemetry on {args.unix or f'127.0.0.1:{args.port}'}", file=sys.stderr, flush=True)
+
+    try:
+        asyncio.run(serve(monitor, emit, port=args.port, unix_path=args.unix, tick_interval=args.tick, ready=ready))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
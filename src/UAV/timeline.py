@@ -0,0 +1,53 @@
+import numpy as np
+
+
+class Timeline:
+    def __init__(self, trajectories):
+        """Looks up where each of many trajectories is at a given time.
+
+        The samples of all trajectories are kept in one array sorted by trajectory, then
+        time, with both folded into one key, so a single searchsorted finds the latest sample
+        of every trajectory in flight: O(drones * log samples) per lookup instead of scanning
+        every timestamp of every drone.
+        """
+        lengths = np.array([len(t) for t in trajectories], dtype=np.int64)
+        if len(trajectories):
+            coords = np.concatenate([t.coordinates() for t in trajectories])
+            times = np.concatenate([t.timestamp for t in trajectories])
+        else:
+            coords, times = np.empty((0, 3)), np.empty(0)
+        self._build(coords, times, lengths)
+
+    @classmethod
+    def from_arrays(cls, coords, times, lengths):
+        """Timeline over samples already concatenated trajectory by trajectory, used without copying.
+
+        coords is (N, 3) lat/long/alt and times holds the N timestamps (e.g. views into shared
+        memory); lengths is the number of samples of each trajectory.
+        """
+        timeline = cls.__new__(cls)
+        timeline._build(coords, times, np.asarray(lengths, dtype=np.int64))
+        return timeline
+
+    def _build(self, coords, times, lengths):
+        offsets = np.concatenate(([0], np.cumsum(lengths)))
+        # Trajectories without samples are never in flight
+        self.drones = np.flatnonzero(lengths > 0)
+        self.coords = coords
+        self.start = times[offsets[self.drones]]
+        self.end = times[offsets[self.drones + 1] - 1]
+
+        # Times relative to the earliest sample keep the folded keys exact in float64
+        self._origin = times.min() if len(times) else 0.0
+        self._stride = times.max() - self._origin + 1.0 if len(times) else 1.0
+        rank = np.repeat(np.arange(len(self.drones)), lengths[self.drones])
+        self._keys = rank * self._stride + (times - self._origin)
+
+    def __len__(self):
+        return len(self.drones)
+
+    def positions(self, current_time):
+        """(indices of the trajectories in flight at current_time, (K, 3) lat/long/alt of their latest samples)."""
+        active = np.flatnonzero((self.start <= current_time) & (self.end >= current_time))
+        idx = np.searchsorted(self._keys, active * self._stride + (current_time - self._origin), side='right') - 1
+        return self.drones[active], self.coords[idx]
@@ -0,0 +1,43 @@
+import numpy as np
+import pandas as pd
+
+
+class Trajectory:
+    """Compact time-stamped track stored as contiguous float64 arrays.
+
+    Holds lat, long, alt and timestamp (epoch seconds, float so sub-second sampling works)
+    without any per-object DataFrame overhead. Use to_dataframe() when a table is needed.
+    """
+    __slots__ = ('lat', 'long', 'alt', 'timestamp')
+
+    def __init__(self, lat, long, alt, timestamp):
+        self.lat = np.ascontiguousarray(lat, dtype=np.float64)
+        self.long = np.ascontiguousarray(long, dtype=np.float64)
+        self.alt = np.ascontiguousarray(alt, dtype=np.float64)
+        self.timestamp = np.ascontiguousarray(timestamp, dtype=np.float64)
+        if not (len(self.lat) == len(self.long) == len(self.alt) == len(self.timestamp)):
+            raise ValueError("lat, long, alt and timestamp must have the same length")
+
+    def __len__(self):
+        return len(self.lat)
+
+    def __getitem__(self, index):
+        """Sub-trajectory for a slice, mask or index array."""
+        return Trajectory(self.lat[index], self.long[index], self.alt[index], self.timestamp[index])
+
+    def coordinates(self):
+        """(N, 3) array of lat, long, alt."""
+        return np.column_stack((self.lat, self.long, self.alt))
+
+    def to_dataframe(self):
+        """DataFrame view with the lat, long, alt, timestamp columns used across the project."""
+        return pd.DataFrame({'lat': self.lat, 'long': self.long, 'alt': self.alt, 'timestamp': self.timestamp})
+
+    @classmethod
+    def from_dataframe(cls, df):
+        """Builds a trajectory from a DataFrame with lat, long, alt and timestamp columns."""
+        return cls(df['lat'].to_numpy(), df['long'].to_numpy(), df['alt'].to_numpy(), df['timestamp'].to_numpy())
+
+    @property
+    def nbytes(self):
+        return self.lat.nbytes + self.long.nbytes + self.alt.nbytes + self.timestamp.nbytes
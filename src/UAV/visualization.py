@@ -1,17 +1,32 @@
 import matplotlib.pyplot as plt
 from mpl_toolkits.mplot3d import Axes3D
+from mpl_toolkits.mplot3d.art3d import Line3DCollection
 from matplotlib.animation import FuncAnimation
-import path,deconflict
+import numpy as np
+import path,deconflict,timeline,decimate
+
+# Sim drones named in plot legends; a legend entry per drone of a large fleet costs more to draw than the paths
+MAX_LEGEND_DRONES = 10
+
+def scene_span(paths):
+    """Per-axis extent of the primary and sim paths, for level-of-detail decimation."""
+    return decimate.scene_span([paths.primary_path.trajectory.coordinates()] +
+                               [path.trajectory.coordinates() for path in paths.sim_paths])
 
 def visualize_paths(paths):
-    """Visualizes the paths in 3D space using Matplotlib."""
+    """Visualizes the paths in 3D space using Matplotlib.
+
+    Paths are decimated to the screen resolution (see decimate.py) before plotting.
+    """
 
     fig = plt.figure(figsize=(10, 8))
     ax = fig.add_subplot(111, projection='3d')
+    span = scene_span(paths)
 
-    lat = paths.primary_path.wp_data['lat']
-    long = paths.primary_path.wp_data['long']
-    alt = paths.primary_path.wp_data['alt']
+    primary = decimate.decimate(paths.primary_path.trajectory, span)
+    lat = primary.lat
+    long = primary.long
+    alt = primary.alt
     
     # Plot the path in 3D space
     ax.plot(lat, long, alt, label="primary drone",color='green')
@@ -19,13 +34,13 @@ def visualize_paths(paths):
     # Iterate over each Path object in the Paths instance
     for i,path in enumerate(paths.sim_paths):
         # Extract lat, long, and alt data from each path
-        
-        lat = path.wp_data['lat']
-        long = path.wp_data['long']
-        alt = path.wp_data['alt']
+        trajectory = decimate.decimate(path.trajectory, span)
+        lat = trajectory.lat
+        long = trajectory.long
+        alt = trajectory.alt
         
         # Plot the path in 3D space
-        ax.plot(lat, long, alt, label=f"sim drone: {i}")
+        ax.plot(lat, long, alt, label=f"sim drone: {i}" if i < MAX_LEGEND_DRONES else None)
 
     # Set labels for the axes
     ax.set_xlabel('Latitude')
@@ -42,7 +57,12 @@ def visualize_paths(paths):
     plt.show()
 
 def visualize_conflicts(paths,deconflict_results):
-    """Visualizes the paths in 3D space with enhanced conflict markers."""
+    """Visualizes the paths in 3D space with enhanced conflict markers.
+
+    deconflict_results is a record array of conflict intervals (see intervals.py). Paths
+    are decimated to the screen resolution, keeping the primary samples at the ends and
+    closest approach of every interval.
+    """
 
     fig = plt.figure(figsize=(12, 9))
     ax = fig.add_subplot(111, projection='3d')
@@ -51,9 +71,15 @@ def visualize_conflicts(paths,deconflict_results):
     ax.set_facecolor('#1a1a1a')
     fig.patch.set_facecolor('#2d2d2d')
 
-    lat = paths.primary_path.wp_data['lat']
-    long = paths.primary_path.wp_data['long']
-    alt = paths.primary_path.wp_data['alt']
+    span = scene_span(paths)
+    timestamps = paths.primary_path.trajectory.timestamp
+    conflict_times = np.concatenate((deconflict_results.start_time, deconflict_results.end_time,
+                                     deconflict_results.primary_time))
+    keep = np.clip(np.searchsorted(timestamps, conflict_times), 0, max(len(timestamps) - 1, 0))
+    primary = decimate.decimate(paths.primary_path.trajectory, span, keep=keep if len(timestamps) else None)
+    lat = primary.lat
+    long = primary.long
+    alt = primary.alt
     
     # Plot the primary path in 3D space
     ax.plot(lat, long, alt, label="Primary Drone", color='#00ff88', linewidth=2, alpha=0.8)
@@ -62,31 +88,32 @@ def visualize_conflicts(paths,deconflict_results):
     colors = ['#00d4ff', '#ff9500', '#ff00ff', '#ffff00']  # Different colors for sim drones
     for i, path in enumerate(paths.sim_paths):
         # Extract lat, long, and alt data from each path
-        lat = path.wp_data['lat']
-        long = path.wp_data['long']
-        alt = path.wp_data['alt']
+        trajectory = decimate.decimate(path.trajectory, span)
+        lat = trajectory.lat
+        long = trajectory.long
+        alt = trajectory.alt
         
         # Plot the path in 3D space with distinct colors
         color = colors[i % len(colors)]
-        ax.plot(lat, long, alt, label=f"Sim Drone {i+1}", color=color, linewidth=2, alpha=0.7)
-
-    # Collect all conflicting indices
-    conflicting_indices = []
-    for conflict in deconflict_results:
-        conflicting_indices.extend(conflict['indices_df1'])
-
-    if conflicting_indices:
-        # Remove duplicates and sort
-        conflicting_indices = sorted(set(conflicting_indices))
-        
-        lat_conflict = paths.primary_path.wp_data.loc[conflicting_indices, 'lat']
-        long_conflict = paths.primary_path.wp_data.loc[conflicting_indices, 'long']
-        alt_conflict = paths.primary_path.wp_data.loc[conflicting_indices, 'alt']
-
-        # Plot conflict zones with multiple visual indicators
-        # 1. Large red spheres for conflict points
+        ax.plot(lat, long, alt, label=f"Sim Drone {i+1}" if i < MAX_LEGEND_DRONES else None, color=color, linewidth=2, alpha=0.7)
+
+    if len(deconflict_results):
+        # 1. Thick red overlay on the primary path for the span of each conflict interval
+        for i, interval in enumerate(deconflict_results):
+            in_interval = (primary.timestamp >= interval.start_time) & (primary.timestamp <= interval.end_time)
+            ax.plot(primary.lat[in_interval], primary.long[in_interval], primary.alt[in_interval],
+                   label="Conflict Interval" if i == 0 else None,
+                   color='red',
+                   linewidth=5,
+                   alpha=0.6)
+
+        lat_conflict = deconflict_results.primary_lat
+        long_conflict = deconflict_results.primary_long
+        alt_conflict = deconflict_results.primary_alt
+
+        # 2. Large red spheres at the closest approach of each interval
         ax.scatter(lat_conflict, long_conflict, alt_conflict, 
-                  label="⚠ CONFLICT ZONE", 
+                  label="⚠ CLOSEST APPROACH", 
                   color='red', 
                   s=300, 
                   alpha=0.8,
@@ -94,20 +121,20 @@ def visualize_conflicts(paths,deconflict_results):
                   linewidths=3,
                   marker='o')
         
-        # 2. Add smaller inner markers for emphasis
+        # 3. Add smaller inner markers for emphasis
         ax.scatter(lat_conflict, long_conflict, alt_conflict, 
                   color='yellow', 
                   s=100, 
                   alpha=1.0,
                   marker='*')
         
-        # 3. Add vertical lines from ground to conflict points for better visibility
-        for lat_c, long_c, alt_c in zip(lat_conflict, long_conflict, alt_conflict):
-            ax.plot([lat_c, lat_c], [long_c, long_c], [0, alt_c], 
-                   color='red', 
-                   linestyle='--', 
-                   linewidth=2, 
-                   alpha=0.5)
+        # 4. Add vertical lines from ground to closest approach points for better visibility, as one collection
+        ground = np.column_stack((lat_conflict, long_conflict, np.zeros(len(alt_conflict))))
+        ax.add_collection3d(Line3DCollection(np.stack((ground, ground + [0, 0, 1] * alt_conflict[:, None]), axis=1),
+                                             colors='red',
+                                             linestyles='--',
+                                             linewidths=2,
+                                             alpha=0.5))
 
     ax.set_zlim([0, alt.max() + 10]) 
 
@@ -120,8 +147,8 @@ def visualize_conflicts(paths,deconflict_results):
     ax.tick_params(colors='white', labelsize=9)
     
     # Set title with conflict count
-    conflict_count = len(conflicting_indices) if conflicting_indices else 0
-    title = f'⚠ CONFLICT VISUALIZATION - {conflict_count} Conflict Points Detected' if conflict_count > 0 else 'Conflict Visualization - No Conflicts'
+    conflict_count = len(deconflict_results)
+    title = f'⚠ CONFLICT VISUALIZATION - {conflict_count} Conflict Intervals Detected' if conflict_count > 0 else 'Conflict Visualization - No Conflicts'
     ax.set_title(title, fontsize=14, fontweight='bold', color='#ff3366' if conflict_count > 0 else '#00ff88', pad=20)
 
     # Customize legend
@@ -141,25 +168,40 @@ def visualize_conflicts(paths,deconflict_results):
 
 
 def visualize_flight(paths):
-    """Visualizes the UAV paths in 3D space with animation."""
+    """Visualizes the UAV paths in 3D space with animation.
+
+    Sim drone positions for each frame come from a Timeline lookup and are drawn as one
+    shared scatter, so frames stay cheap with thousands of drones on screen.
+    """
     
     fig = plt.figure(figsize=(10, 8))
     ax = fig.add_subplot(111, projection='3d')
     ax.set_title('Flight Visualization (4D)')
     # Primary path data
-    primary_df = paths.primary_path.wp_data
-    primary_lat = primary_df['lat']
-    primary_long = primary_df['long']
-    primary_alt = primary_df['alt']
-    primary_time = primary_df['timestamp']
+    primary = paths.primary_path.trajectory
+    primary_lat = primary.lat
+    primary_long = primary.long
+    primary_alt = primary.alt
+    primary_time = primary.timestamp
     
     # Get primary drone start and end time
     start_time, end_time = paths.primary_path.start_time, paths.primary_path.end_time
     
-    # Plot static paths
-    ax.plot(primary_lat, primary_long, primary_alt, label="primary drone", color='green')
-    for i,path in enumerate(paths.sim_paths):
-        ax.plot(path.wp_data['lat'], path.wp_data['long'], path.wp_data['alt'], label=f"sim drone: {i}")
+    # Plot static paths (decimated), all sim paths in one collection
+    span = scene_span(paths)
+    static_primary = decimate.decimate(primary, span)
+    ax.plot(static_primary.lat, static_primary.long, static_primary.alt, label="primary drone", color='green')
+    sim_trajectories = [path.trajectory for path in paths.sim_paths]
+    sim_lines = Line3DCollection([decimate.decimate(t, span).coordinates() for t in sim_trajectories],
+                                 label="sim drones", linewidths=1,
+                                 colors=plt.rcParams['axes.prop_cycle'].by_key()['color'])
+    fleet = timeline.Timeline(sim_trajectories)
+    if len(fleet):
+        ax.add_collection3d(sim_lines)
+        # Collections do not update the axis limits by themselves
+        lower = np.minimum(fleet.coords.min(axis=0), primary.coordinates().min(axis=0, initial=np.inf))
+        upper = np.maximum(fleet.coords.max(axis=0), primary.coordinates().max(axis=0, initial=-np.inf))
+        ax.auto_scale_xyz(*zip(lower, upper))
     
     # Set axis labels
     ax.set_xlabel('Latitude')
@@ -169,36 +211,25 @@ def visualize_flight(paths):
     
     # Scatter points for animation
     primary_scatter, = ax.plot([], [], [], 'ro', label='Primary Drone')
-    sim_scatters = [ax.plot([], [], [], 'go', label=f'Sim Drone {i}')[0] for i in range(len(paths.sim_paths))]
+    sim_scatter = ax.scatter([], [], [], color='green', label='Sim Drones')
     
     def update(frame):
         current_time = start_time + frame
         
         # Update primary drone position
-        idx = (primary_time <= current_time).sum() - 1
+        idx = np.searchsorted(primary_time, current_time, side='right') - 1
         if idx >= 0:
-            primary_scatter.set_data([primary_lat.iloc[idx]], [primary_long.iloc[idx]])
-            primary_scatter.set_3d_properties([primary_alt.iloc[idx]])
+            primary_scatter.set_data([primary_lat[idx]], [primary_long[idx]])
+            primary_scatter.set_3d_properties([primary_alt[idx]])
             primary_scatter.set_visible(True)
         else:
             primary_scatter.set_visible(False)
         
-        # Update simulation drones' positions
-        for i, path in enumerate(paths.sim_paths):
-            sim_time = path.wp_data['timestamp']
-            sim_lat, sim_long, sim_alt = path.wp_data['lat'], path.wp_data['long'], path.wp_data['alt']
-            
-            # Check if sim drone should be visible
-            if sim_time.min() <= current_time <= sim_time.max():
-                sim_idx = (sim_time <= current_time).sum() - 1
-                if sim_idx >= 0:
-                    sim_scatters[i].set_data([sim_lat.iloc[sim_idx]], [sim_long.iloc[sim_idx]])
-                    sim_scatters[i].set_3d_properties([sim_alt.iloc[sim_idx]])
-                    sim_scatters[i].set_visible(True)
-            else:
-                sim_scatters[i].set_visible(False)  # Hide drone
+        # Update simulation drones' positions; drones outside their time window are left out
+        _, positions = fleet.positions(current_time)
+        sim_scatter._offsets3d = (positions[:, 0], positions[:, 1], positions[:, 2])
                 
-        return [primary_scatter] + sim_scatters
+        return [primary_scatter, sim_scatter]
 
     # Create animation
     frames = int(end_time - start_time) + 1